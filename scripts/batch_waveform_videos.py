@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Render waveform videos for a whole directory of audio files.
+
+Every input is rendered with generate_waveform_video.py's pipeline inside a
+pool of long-lived worker processes, so Python and matplotlib start once per
+worker instead of once per file. A manifest in the output directory records
+the content hash of each input and the parameters it was rendered with;
+re-runs skip outputs whose input and parameters are unchanged.
+
+Examples
+--------
+# Render every generated speech sample with four workers
+python scripts/batch_waveform_videos.py scripts/generated-speech videos/ --workers 4
+
+# Only the Gemini samples, titled with their file names
+python scripts/batch_waveform_videos.py "scripts/generated-speech/gemini-*.mp3" videos/ --title-from-name
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+import generate_waveform_video as gwv
+
+AUDIO_EXTENSIONS = {".aac", ".flac", ".m4a", ".mp3", ".ogg", ".opus", ".wav"}
+MANIFEST_NAME = "waveform-manifest.json"
+
+
+@dataclass(frozen=True)
+class RenderParams:
+    """Everything besides the input audio that affects an output video."""
+
+    style: str
+    width: int
+    height: int
+    fps: int
+    sample_rate: int
+    preset: str
+    backend: str
+    rms: bool
+    title: str | None
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    audio_path: str
+    output_path: str
+    content_hash: str
+    params: RenderParams
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Render waveform videos for a directory or glob of audio files.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="Audio directories or glob patterns (quote globs to keep the "
+        "shell from expanding them)",
+    )
+    parser.add_argument("output_dir", help="Directory receiving the videos")
+    parser.add_argument(
+        "--style",
+        choices=sorted(gwv.STYLES),
+        default="neon",
+        help="Color and layout preset to use",
+    )
+    parser.add_argument(
+        "--fps", type=int, default=30, help="Frames per second for the video"
+    )
+    parser.add_argument(
+        "--width", type=int, default=1280, help="Video width in pixels"
+    )
+    parser.add_argument(
+        "--height", type=int, default=720, help="Video height in pixels"
+    )
+    parser.add_argument(
+        "--sample-rate",
+        type=int,
+        default=44_100,
+        help="Sample rate to decode audio for waveform analysis",
+    )
+    parser.add_argument(
+        "--title-from-name",
+        action="store_true",
+        help="Title each video with its audio file name",
+    )
+    parser.add_argument(
+        "--preset",
+        default="medium",
+        help="ffmpeg x264 preset used to encode the videos",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(gwv.RENDERERS),
+        default="matplotlib",
+        help="Frame rasterizer: matplotlib/Agg or the pure-NumPy renderer",
+    )
+    parser.add_argument(
+        "--rms",
+        action="store_true",
+        help="Also compute an RMS envelope and draw it as an inner band",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes, each rendering one file at a time",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Envelope cache shared by all workers (see generate_waveform_video.py)",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=256,
+        help="Size cap of --cache-dir; least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-render every file even if the manifest says it is up to date",
+    )
+    return parser.parse_args()
+
+
+def find_audio_files(inputs: list[str]) -> list[Path]:
+    """Expand directories and glob patterns into a sorted list of audio files."""
+
+    found = set()
+    for pattern in inputs:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = path.iterdir()
+        else:
+            candidates = (Path(match) for match in glob.glob(pattern, recursive=True))
+        found.update(
+            candidate.resolve()
+            for candidate in candidates
+            if candidate.is_file() and candidate.suffix.lower() in AUDIO_EXTENSIONS
+        )
+    return sorted(found)
+
+
+def load_manifest(path: Path) -> dict[str, dict]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return {}
+    except ValueError:
+        print(f"Ignoring unreadable manifest {path}", file=sys.stderr)
+        return {}
+
+
+def save_manifest(path: Path, manifest: dict[str, dict]) -> None:
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    os.replace(tmp_path, path)
+
+
+def manifest_entry(job: RenderJob) -> dict:
+    return {
+        "input": job.audio_path,
+        "sha256": job.content_hash,
+        "params": asdict(job.params),
+    }
+
+
+def is_up_to_date(job: RenderJob, manifest: dict[str, dict]) -> bool:
+    output_name = Path(job.output_path).name
+    entry = manifest.get(output_name)
+    if entry is None or not Path(job.output_path).exists():
+        return False
+    expected = manifest_entry(job)
+    return (
+        entry.get("sha256") == expected["sha256"]
+        and entry.get("params") == expected["params"]
+    )
+
+
+_worker_cache: gwv.EnvelopeCache | None = None
+
+
+def _init_worker(cache_dir: str | None, cache_bytes: int) -> None:
+    global _worker_cache
+    if cache_dir:
+        _worker_cache = gwv.EnvelopeCache(cache_dir, cache_bytes)
+
+
+def _render_job(
+    job: RenderJob,
+) -> tuple[RenderJob, float, gwv.RenderStats | None, str | None]:
+    """Render one job, returning its wall time, stats and any error message."""
+
+    params = job.params
+    start = time.perf_counter()
+    try:
+        stats = gwv.render_waveform_video(
+            job.audio_path,
+            job.output_path,
+            style=gwv.STYLES[params.style],
+            resolution=(params.width, params.height),
+            fps=params.fps,
+            sample_rate=params.sample_rate,
+            title=params.title,
+            preset=params.preset,
+            backend=params.backend,
+            rms=params.rms,
+            cache=_worker_cache,
+            content_hash=job.content_hash,
+        )
+    except Exception as exc:  # Keep the rest of the batch going
+        return job, time.perf_counter() - start, None, f"{type(exc).__name__}: {exc}"
+    return job, time.perf_counter() - start, stats, None
+
+
+def main() -> None:
+    args = parse_args()
+
+    audio_files = find_audio_files(args.inputs)
+    if not audio_files:
+        raise FileNotFoundError(f"No audio files found in: {' '.join(args.inputs)}")
+
+    stems = [audio_file.stem for audio_file in audio_files]
+    duplicates = sorted({stem for stem in stems if stems.count(stem) > 1})
+    if duplicates:
+        raise ValueError(
+            "Several inputs would write the same output: " + ", ".join(duplicates)
+        )
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+
+    jobs = []
+    skipped = 0
+    for audio_file in audio_files:
+        params = RenderParams(
+            style=args.style,
+            width=args.width,
+            height=args.height,
+            fps=args.fps,
+            sample_rate=args.sample_rate,
+            preset=args.preset,
+            backend=args.backend,
+            rms=args.rms,
+            title=audio_file.stem if args.title_from_name else None,
+        )
+        job = RenderJob(
+            audio_path=str(audio_file),
+            output_path=str(output_dir / f"{audio_file.stem}.mp4"),
+            content_hash=gwv.hash_file(str(audio_file)),
+            params=params,
+        )
+        if not args.force and is_up_to_date(job, manifest):
+            skipped += 1
+        else:
+            jobs.append(job)
+
+    print(f"{len(jobs)} to render, {skipped} up to date")
+    if not jobs:
+        return
+
+    failures = []
+    workers = max(1, min(args.workers, len(jobs)))
+    with multiprocessing.Pool(
+        workers,
+        initializer=_init_worker,
+        initargs=(args.cache_dir, args.cache_size_mb * 1024 * 1024),
+    ) as pool:
+        for done, (job, elapsed, stats, error) in enumerate(
+            pool.imap_unordered(_render_job, jobs), start=1
+        ):
+            name = Path(job.output_path).name
+            if error is not None:
+                failures.append(job)
+                print(f"[{done}/{len(jobs)}] FAILED {name}: {error}", file=sys.stderr)
+                continue
+            # Save after every file so an interrupted batch keeps its progress.
+            manifest[name] = manifest_entry(job)
+            save_manifest(manifest_path, manifest)
+            print(
+                f"[{done}/{len(jobs)}] Wrote {name} in {elapsed:.1f}s "
+                f"({stats.reused_frames}/{stats.frame_count} frames reused)"
+            )
+
+    if failures:
+        sys.exit(f"{len(failures)} of {len(jobs)} files failed to render.")
+
+
+if __name__ == "__main__":
+    main()
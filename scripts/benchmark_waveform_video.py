@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""Benchmark generate_waveform_video.py and compare against a baseline.
+
+Synthetic audio (a sine sweep, white noise and speech-like bursts) is written
+to temporary WAV files, then every case runs in a fresh process that resets
+its peak RSS before measuring, so the memory the launcher used for the WAVs
+is not counted:
+
+- decode: each signal is decoded into an envelope (wall time, ffmpeg CPU time
+  and realtime factor).
+- render: every style at 1280x720, 1920x1080 and 1080x1920, at 30 and 60 fps,
+  is rendered and encoded (setup time, per-frame render mean/p95, encode
+  throughput in frames per ffmpeg CPU-second, end-to-end fps).
+- startup: the CLI is run with ``--help`` and with invalid arguments, which
+  must exit within ``--startup-budget-ms`` (median of ``--startup-runs``).
+- parity: every signal is drawn in every style by both backends at 720p with
+  the RMS band, at the start, middle and end of the timeline. At most
+  ``--parity-fraction`` of the pixels may differ by more than
+  ``--parity-levels`` in any channel.
+
+Every run also times a fixed NumPy and pure-Python calibration workload.
+Timings and throughputs are compared with the committed baseline relative
+to it, so a uniformly slower or faster machine does not look like a
+regression. Any metric worse than the baseline by more than ``--tolerance``
+after that scaling, a startup case over budget or a parity case out of
+tolerance fails the run.
+
+Examples
+--------
+# Full matrix, compared against scripts/benchmarks/waveform_video_baseline.json
+python scripts/benchmark_waveform_video.py --output waveform-bench.json
+
+# Refresh the baseline on the reference machine
+python scripts/benchmark_waveform_video.py --update-baseline
+
+# Only check CLI startup
+python scripts/benchmark_waveform_video.py --groups startup
+
+# Only check that the NumPy backend matches matplotlib
+python scripts/benchmark_waveform_video.py --groups parity
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.metadata
+import json
+import multiprocessing
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+import generate_waveform_video as gwv
+
+BASELINE_PATH = Path(__file__).parent / "benchmarks" / "waveform_video_baseline.json"
+RESOLUTIONS = {"720p": (1280, 720), "1080p": (1920, 1080), "vertical": (1080, 1920)}
+FRAME_RATES = (30, 60)
+GROUPS = ("decode", "render", "startup", "parity")
+SCRIPT_PATH = Path(__file__).parent / "generate_waveform_video.py"
+
+# Startup case -> CLI arguments that make the script exit before rendering.
+STARTUP_CASES = {
+    "help": ["--help"],
+    "missing-audio": ["missing.wav", "out.mp4"],
+    "invalid-style": ["missing.wav", "out.mp4", "--style", "nope"],
+}
+
+# Metric name -> (True when a larger value is an improvement, True when it
+# scales with CPU speed and is compared relative to the calibration case).
+METRICS = {
+    "decode_s": (False, True),
+    "setup_ms": (False, True),
+    "frame_mean_ms": (False, True),
+    "frame_p95_ms": (False, True),
+    "encode_fps": (True, True),
+    "pipeline_fps": (True, True),
+    "peak_rss_mb": (False, False),
+    "startup_ms": (False, True),
+}
+
+
+def sine_sweep(duration: float, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    frequency = 110 * (1 + 7 * t / duration)
+    return 0.8 * np.sin(2 * np.pi * np.cumsum(frequency) / sample_rate)
+
+
+def white_noise(duration: float, sample_rate: int, rng: np.random.Generator) -> np.ndarray:
+    return rng.uniform(-0.7, 0.7, int(duration * sample_rate))
+
+
+def speech_bursts(
+    duration: float, sample_rate: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Syllable-like voiced bursts separated by short pauses."""
+
+    samples = np.zeros(int(duration * sample_rate))
+    position = 0
+    while position < samples.size:
+        length = int(rng.uniform(0.08, 0.35) * sample_rate)
+        t = np.arange(min(length, samples.size - position)) / sample_rate
+        pitch = rng.uniform(90, 220)
+        voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        window = np.sin(np.pi * np.arange(t.size) / max(t.size, 1)) ** 2
+        samples[position : position + t.size] = (
+            rng.uniform(0.2, 0.9) * window * voiced / 2.3
+        )
+        position += t.size + int(rng.uniform(0.03, 0.25) * sample_rate)
+    return samples
+
+
+SIGNALS = {"sine": sine_sweep, "noise": white_noise, "speech": speech_bursts}
+
+
+def write_wav(path: Path, samples: np.ndarray, sample_rate: int) -> None:
+    pcm = np.clip(samples * 32767, -32768, 32767).astype("<i2")
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(sample_rate)
+        handle.writeframes(pcm.tobytes())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the waveform video renderer against a baseline.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=5.0,
+        help="Seconds of synthetic audio rendered in every render case",
+    )
+    parser.add_argument(
+        "--decode-durations",
+        type=float,
+        nargs="+",
+        default=[10.0, 120.0],
+        help="Seconds of synthetic audio decoded in the decode cases",
+    )
+    parser.add_argument(
+        "--sample-rate", type=int, default=44_100, help="Synthetic audio sample rate"
+    )
+    parser.add_argument(
+        "--styles",
+        nargs="+",
+        choices=sorted(gwv.STYLES),
+        default=sorted(gwv.STYLES),
+        help="Styles to render",
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=sorted(RESOLUTIONS),
+        default=list(RESOLUTIONS),
+        help="Resolutions to render",
+    )
+    parser.add_argument(
+        "--fps",
+        type=int,
+        nargs="+",
+        default=list(FRAME_RATES),
+        help="Frame rates to render",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(gwv.RENDERERS),
+        default="matplotlib",
+        help="Frame rasterizer to benchmark",
+    )
+    parser.add_argument(
+        "--preset",
+        default="medium",
+        help="ffmpeg x264 preset used in the render cases",
+    )
+    parser.add_argument(
+        "--groups",
+        nargs="+",
+        choices=GROUPS,
+        default=list(GROUPS),
+        help="Benchmark groups to run",
+    )
+    parser.add_argument(
+        "--startup-runs",
+        type=int,
+        default=5,
+        help="Runs per startup case; the median is reported",
+    )
+    parser.add_argument(
+        "--startup-budget-ms",
+        type=float,
+        default=500.0,
+        help="Maximum median time for the CLI to exit on --help or invalid "
+        "arguments",
+    )
+    parser.add_argument(
+        "--parity-levels",
+        type=int,
+        default=16,
+        help="Largest per-channel difference between the backends that "
+        "counts as a match",
+    )
+    parser.add_argument(
+        "--parity-fraction",
+        type=float,
+        default=0.001,
+        help="Largest fraction of pixels allowed to differ by more than "
+        "--parity-levels",
+    )
+    parser.add_argument(
+        "--output", default=None, help="Write the results to this JSON file"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=str(BASELINE_PATH),
+        help="Baseline JSON to compare against",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed relative regression per metric before the run fails",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Replace the baseline groups that were run with these results "
+        "instead of comparing",
+    )
+    return parser.parse_args()
+
+
+def _child_cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _reset_peak_rss() -> None:
+    """Restart the peak RSS count from the current RSS, where Linux allows it.
+
+    A spawned child inherits its parent's ``ru_maxrss`` across fork and
+    exec, so without this every case would report the launcher's peak.
+    """
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> float:
+    try:
+        status = Path("/proc/self/status").read_text()
+    except OSError:
+        # ru_maxrss is in KiB on Linux and bytes on macOS.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024 / 1e6
+    raise RuntimeError("VmHWM missing from /proc/self/status")
+
+
+def bench_calibration(runs: int = 15) -> dict:
+    """Time a fixed workload the renderer's speed can be measured against.
+
+    It mixes NumPy passes over a cache-sized array with a pure-Python loop
+    and does not touch generate_waveform_video, so a change there cannot
+    move it. The fastest run is reported, as the one least disturbed by
+    other load.
+    """
+    data = np.random.default_rng(0).standard_normal(1 << 16)
+    scratch = np.empty_like(data)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(20):
+            np.sort(data)
+            np.multiply(data, data, out=scratch)
+            np.cumsum(data)
+        sum(index * index for index in range(100_000))
+        timings.append(time.perf_counter() - start)
+    return {"calibration_ms": min(timings) * 1000}
+
+
+def bench_decode(audio_path: str, duration: float, sample_rate: int) -> dict:
+    _reset_peak_rss()
+    cpu_start = _child_cpu_seconds()
+    start = time.perf_counter()
+    gwv.decode_audio(audio_path, sample_rate)
+    elapsed = time.perf_counter() - start
+    return {
+        "decode_s": elapsed,
+        "ffmpeg_cpu_s": _child_cpu_seconds() - cpu_start,
+        "realtime_factor": duration / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_render(
+    audio_path: str,
+    style: str,
+    resolution: tuple[int, int],
+    fps: int,
+    backend: str,
+    preset: str,
+    sample_rate: int,
+) -> dict:
+    # The renderer imports matplotlib lazily; import it up front so setup_ms
+    # measures building the renderer, and the startup cases cover imports.
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import matplotlib.figure  # noqa: F401
+
+    _reset_peak_rss()
+    analysis = gwv.load_envelope(
+        audio_path, sample_rate, points=gwv.axes_columns(resolution[0]))
+    times = np.linspace(0, analysis.duration, analysis.envelope.size)
+    config = gwv.RendererConfig(
+        backend=backend,
+        times=times,
+        envelope=analysis.envelope,
+        style=gwv.STYLES[style],
+        resolution=resolution,
+        title="Benchmark",
+    )
+    start = time.perf_counter()
+    renderer = config.build()
+    setup_s = time.perf_counter() - start
+
+    frame_times = np.arange(int(analysis.duration * fps)) / fps
+    changed = gwv.changed_frames(gwv.frame_keys(times, resolution[0], frame_times))
+    frame_seconds = []
+
+    def timed_frames():
+        frame = None
+        for t, render in zip(frame_times, changed):
+            if render:
+                frame_start = time.perf_counter()
+                frame = renderer.make_frame(t)
+                frame_seconds.append(time.perf_counter() - frame_start)
+            yield frame
+
+    with tempfile.TemporaryDirectory(prefix="waveform-bench-") as scratch:
+        cpu_start = _child_cpu_seconds()
+        start = time.perf_counter()
+        gwv.encode_video(
+            timed_frames(),
+            str(Path(scratch) / "bench.mp4"),
+            resolution=resolution,
+            fps=fps,
+            audio_path=audio_path,
+            preset=preset,
+        )
+        elapsed = time.perf_counter() - start
+        encode_cpu_s = _child_cpu_seconds() - cpu_start
+
+    frame_ms = np.asarray(frame_seconds) * 1000
+    return {
+        "frames": len(frame_times),
+        "rendered_frames": len(frame_seconds),
+        "setup_ms": setup_s * 1000,
+        "frame_mean_ms": float(frame_ms.mean()),
+        "frame_p95_ms": float(np.percentile(frame_ms, 95)),
+        "encode_fps": len(frame_times) / encode_cpu_s,
+        "pipeline_fps": len(frame_times) / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def bench_startup(arguments: list[str], runs: int) -> dict:
+    """Time the CLI from launch until it exits without rendering."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(SCRIPT_PATH), *arguments], capture_output=True
+        )
+        timings.append(time.perf_counter() - start)
+    return {"startup_ms": float(np.median(timings)) * 1000}
+
+
+def bench_parity(
+    audio_path: str, style: str, resolution: tuple[int, int], levels: int,
+    sample_rate: int,
+) -> dict:
+    """Compare frames of the matplotlib and NumPy backends pixel by pixel.
+
+    The title is left out: the backends rasterize text with different font
+    engines, so it is not expected to match.
+    """
+    analysis = gwv.load_envelope(
+        audio_path, sample_rate, points=gwv.axes_columns(resolution[0]),
+        rms=True)
+    times = np.linspace(0, analysis.duration, analysis.envelope.size)
+    renderers = [
+        gwv.RendererConfig(
+            backend=backend,
+            times=times,
+            envelope=analysis.envelope,
+            style=gwv.STYLES[style],
+            resolution=resolution,
+            title=None,
+        ).build()
+        for backend in ("matplotlib", "numpy")
+    ]
+    over = max_levels = 0
+    pixels = 0
+    for t in (0.0, analysis.duration / 2, analysis.duration):
+        reference, frame = (
+            np.asarray(renderer.make_frame(t))[..., :3].astype(np.int16)
+            for renderer in renderers
+        )
+        difference = np.abs(reference - frame).max(axis=-1)
+        over += int(np.count_nonzero(difference > levels))
+        max_levels = max(max_levels, int(difference.max()))
+        pixels += difference.size
+    return {"parity_over_fraction": over / pixels, "parity_max_levels": max_levels}
+
+
+def run_isolated(function, *args) -> dict:
+    """Run one case in a fresh interpreter, away from the launcher's state."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return a description of every metric that regressed past ``tolerance``.
+
+    Metrics that scale with CPU speed are compared after dividing out the
+    ratio of the two runs' calibration times.
+    """
+
+    calibration = results["meta"].get("calibration_ms")
+    reference_calibration = baseline.get("meta", {}).get("calibration_ms")
+    speed = (
+        calibration / reference_calibration
+        if calibration and reference_calibration
+        else 1.0
+    )
+    regressions = []
+    for group in GROUPS:
+        for case, metrics in results.get(group, {}).items():
+            reference = baseline.get(group, {}).get(case)
+            if reference is None:
+                continue
+            for metric, (higher_is_better, relative) in METRICS.items():
+                if metric not in metrics or not reference.get(metric):
+                    continue
+                ratio = metrics[metric] / reference[metric]
+                if relative:
+                    # A slower machine takes longer and has lower throughput.
+                    ratio = ratio * speed if higher_is_better else ratio / speed
+                change = 1 / ratio - 1 if higher_is_better else ratio - 1
+                if change > tolerance:
+                    regressions.append(
+                        f"{group} {case} {metric}: {reference[metric]:.2f} -> "
+                        f"{metrics[metric]:.2f} ({change:+.0%})"
+                    )
+    return regressions
+
+
+def main() -> None:
+    args = parse_args()
+    rng = np.random.default_rng(0)
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": multiprocessing.cpu_count(),
+            "numpy": np.__version__,
+            "matplotlib": importlib.metadata.version("matplotlib"),
+            "backend": args.backend,
+            "preset": args.preset,
+            "duration": args.duration,
+        },
+    }
+    results["meta"].update(run_isolated(bench_calibration))
+    print(f"calibration: {results['meta']['calibration_ms']:.1f}ms")
+    for group in args.groups:
+        results[group] = {}
+
+    with tempfile.TemporaryDirectory(prefix="waveform-bench-") as scratch:
+        for duration in args.decode_durations if "decode" in args.groups else ():
+            for name, signal in SIGNALS.items():
+                path = Path(scratch) / f"{name}-{duration:g}s.wav"
+                write_wav(path, signal(duration, args.sample_rate, rng), args.sample_rate)
+                case = f"{name}/{duration:g}s"
+                results["decode"][case] = run_isolated(
+                    bench_decode, str(path), duration, args.sample_rate
+                )
+                path.unlink()
+                print(f"decode {case}: {results['decode'][case]['decode_s']:.2f}s")
+
+        audio_path = Path(scratch) / "speech.wav"
+        samples = speech_bursts(args.duration, args.sample_rate, rng)
+        write_wav(audio_path, samples, args.sample_rate)
+        for style in args.styles if "render" in args.groups else ():
+            for resolution_name in args.resolutions:
+                resolution = RESOLUTIONS[resolution_name]
+                for fps in args.fps:
+                    case = f"{style}/{resolution_name}/{fps}fps/{args.backend}"
+                    metrics = run_isolated(
+                        bench_render,
+                        str(audio_path),
+                        style,
+                        resolution,
+                        fps,
+                        args.backend,
+                        args.preset,
+                        args.sample_rate,
+                    )
+                    results["render"][case] = metrics
+                    print(
+                        f"render {case}: {metrics['frame_mean_ms']:.1f}ms/frame "
+                        f"(p95 {metrics['frame_p95_ms']:.1f}ms), "
+                        f"{metrics['pipeline_fps']:.1f} fps end to end"
+                    )
+
+        for name, signal in SIGNALS.items() if "parity" in args.groups else ():
+            path = Path(scratch) / f"parity-{name}.wav"
+            write_wav(path, signal(args.duration, args.sample_rate, rng), args.sample_rate)
+            for style in args.styles:
+                case = f"{name}/{style}"
+                metrics = bench_parity(
+                    str(path), style, RESOLUTIONS["720p"], args.parity_levels,
+                    args.sample_rate,
+                )
+                results["parity"][case] = metrics
+                print(
+                    f"parity {case}: {metrics['parity_over_fraction']:.3%} of "
+                    f"pixels over {args.parity_levels} levels "
+                    f"(max {metrics['parity_max_levels']})"
+                )
+
+    over_budget = []
+    for case, arguments in STARTUP_CASES.items() if "startup" in args.groups else ():
+        metrics = bench_startup(arguments, args.startup_runs)
+        results["startup"][case] = metrics
+        print(f"startup {case}: {metrics['startup_ms']:.0f}ms")
+        if metrics["startup_ms"] > args.startup_budget_ms:
+            over_budget.append(
+                f"startup {case}: {metrics['startup_ms']:.0f}ms exceeds the "
+                f"{args.startup_budget_ms:.0f}ms budget"
+            )
+
+    for case, metrics in results.get("parity", {}).items():
+        if metrics["parity_over_fraction"] > args.parity_fraction:
+            over_budget.append(
+                f"parity {case}: {metrics['parity_over_fraction']:.3%} of pixels "
+                f"differ by more than {args.parity_levels} levels "
+                f"(max {metrics['parity_max_levels']}), allowed "
+                f"{args.parity_fraction:.3%}"
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.output}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline = (
+            json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+        )
+        baseline.update(results)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Updated baseline {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}; run with --update-baseline to create it.")
+        regressions = []
+    else:
+        regressions = compare(
+            results, json.loads(baseline_path.read_text()), args.tolerance)
+    regressions += over_budget
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.tolerance:.0%} against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,21 +21,28 @@ Requirements
 """
 
 from __future__ import annotations
-from moviepy import AudioFileClip, VideoClip
-from matplotlib.collections import LineCollection
-from matplotlib.backends.backend_agg import FigureCanvasAgg
-from matplotlib import pyplot as plt
 import numpy as np
 
 import argparse
+import functools
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
 import subprocess
-from dataclasses import dataclass
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
-import matplotlib
-
-matplotlib.use("Agg")
-
 
 @dataclass(frozen=True)
 class WaveformStyle:
@@ -90,6 +97,25 @@ STYLES: dict[str, WaveformStyle] = {
     ),
 }
 
+# Points the envelope cache keeps, more than the axes columns of an 8K
+# render, so a cached envelope serves every output width.
+CACHED_ENVELOPE_POINTS = 1 << 15
+
+# Standard deviation, in points, of the Gaussian that softens glow layers.
+GLOW_SIGMA = 2.5
+
+# Reference levels --normalize can scale the envelope by. "rms" maps the
+# average level to RMS_TARGET, "percentile" a sample magnitude percentile
+# to full scale; samples louder than the reference are clipped.
+NORMALIZE_MODES = ("peak", "rms", "percentile")
+RMS_TARGET = 0.25
+
+# Aspect ratios (width, height) that --formats can render.
+FORMATS = {"landscape": (16, 9), "square": (1, 1), "vertical": (9, 16)}
+
+# Sample dtype of a peaks file for each --peaks-bits value.
+PEAKS_FORMATS = {8: "<i1", 16: "<i2"}
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -102,6 +128,12 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "output", help="Path to the output video file (e.g., output.mp4)"
     )
+    parser.add_argument(
+        "-y",
+        "--overwrite",
+        action="store_true",
+        help="Overwrite an existing output file without asking",
+    )
     parser.add_argument(
         "--style",
         choices=sorted(STYLES),
@@ -130,20 +162,185 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--preset",
         default="medium",
-        help="ffmpeg x264 preset passed to MoviePy",
+        help="ffmpeg x264 preset used to encode the video",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["matplotlib", "numpy"],
+        default="matplotlib",
+        help="Frame rasterizer: matplotlib/Agg or the pure-NumPy renderer",
+    )
+    parser.add_argument(
+        "--rms",
+        action="store_true",
+        help="Also compute an RMS envelope and draw it as an inner band",
+    )
+    parser.add_argument(
+        "--visual",
+        choices=["waveform", "bars"],
+        default="waveform",
+        help="Draw the waveform, or equalizer bars of the audio spectrum",
+    )
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=list(FORMATS),
+        default=None,
+        help="Render each of these aspect ratios to <output>-<format>.mp4 from "
+        "one decode, concurrently. Their short side is the shorter of --width "
+        "and --height",
+    )
+    parser.add_argument(
+        "--bars",
+        type=int,
+        default=48,
+        help="Number of frequency bands drawn by --visual bars",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes rendering frames in parallel, each with its "
+        "own renderer",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=1,
+        help="Encode the video as this many independent chunks, --workers at "
+        "a time, and join them; an interrupted render resumes from the "
+        "finished chunks",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory caching analyzed envelopes by audio content, so "
+        "re-renders of the same audio skip decoding",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=256,
+        help="Size cap of --cache-dir; least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Instead of encoding the video, write a full-size poster and a "
+        "sprite sheet of keyframes named after the output path",
+    )
+    parser.add_argument(
+        "--preview-frames",
+        type=int,
+        default=8,
+        help="Number of keyframes in the --preview sprite sheet",
+    )
+    parser.add_argument(
+        "--preview-width",
+        type=int,
+        default=480,
+        help="Width of sprite sheet tiles and preview animation frames",
+    )
+    parser.add_argument(
+        "--preview-animation",
+        choices=["gif", "webp"],
+        default=None,
+        help="Also write a low-resolution animated preview in this format",
+    )
+    parser.add_argument(
+        "--preview-fps",
+        type=float,
+        default=4.0,
+        help="Frame rate of the --preview-animation",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Record wall and CPU time per stage, log live fps and ETA, and "
+        "write <output>.profile.json",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--trace",
+        default=None,
+        metavar="PATH",
+        help="Also write a Chrome trace-event file of every stage and frame "
+        "(implies --profile)",
+    )
+    parser.add_argument(
+        "--peaks",
+        action="store_true",
+        help="Also write <output>.peaks, min/max pairs at several zoom levels "
+        "for web players, with a <output>.peaks.json header",
+    )
+    parser.add_argument(
+        "--peaks-bits",
+        type=int,
+        choices=sorted(PEAKS_FORMATS),
+        default=8,
+        help="Sample size of the --peaks file",
+    )
+    parser.add_argument(
+        "--normalize",
+        choices=NORMALIZE_MODES,
+        default="peak",
+        help="Scale the waveform by its peak, its RMS level or a percentile "
+        "of sample magnitudes, so one click does not flatten the rest",
+    )
+    parser.add_argument(
+        "--normalize-percentile",
+        type=float,
+        default=99.9,
+        help="Percentile of sample magnitudes drawn at full scale with "
+        "--normalize percentile",
+    )
+    parser.add_argument(
+        "--no-blit",
+        dest="blit",
+        action="store_false",
+        help="Redraw the whole figure on every frame instead of caching the "
+        "static layers and repainting only the columns the playhead crossed",
+    )
+    args = parser.parse_args()
+    if not 0 < args.normalize_percentile <= 100:
+        parser.error("--normalize-percentile must be in (0, 100]")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.segments < 1:
+        parser.error("--segments must be at least 1")
+    if args.bars < 1:
+        parser.error("--bars must be at least 1")
+    if args.preview_frames < 1:
+        parser.error("--preview-frames must be at least 1")
+    if args.preview_width < 1:
+        parser.error("--preview-width must be at least 1")
+    if args.preview_fps <= 0:
+        parser.error("--preview-fps must be positive")
+    return args
 
 
-def decode_audio(audio_path: str, sample_rate: int) -> np.ndarray:
-    """Decode audio to a mono float waveform using ffmpeg.
+def iter_audio_blocks(
+    audio_path: str,
+    sample_rate: int,
+    block_samples: int = 1 << 16,
+    audio_track: str | None = None,
+) -> Iterator[np.ndarray]:
+    """Stream audio as mono float blocks decoded by ffmpeg.
 
-    This keeps dependencies light while allowing almost any audio format to be
-    processed, as long as ffmpeg can decode it.
+    Only one block of ``block_samples`` samples is held at a time; the yielded
+    array is reused for the next block, so consumers must reduce or copy it
+    before asking for more. This keeps dependencies light while allowing
+    almost any audio format to be processed, as long as ffmpeg can decode it.
+
+    When ``audio_track`` is given, the same decode also encodes the audio to
+    AAC at that path, ready to be muxed into the video without decoding the
+    input again.
     """
 
     command = [
         "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
         "-i",
         audio_path,
         "-f",
@@ -156,32 +353,884 @@ def decode_audio(audio_path: str, sample_rate: int) -> np.ndarray:
         str(sample_rate),
         "-",
     ]
+    if audio_track is not None:
+        command += ["-vn", "-c:a", "aac", audio_track]
 
-    process = subprocess.run(
-        command, check=False, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
+    block = np.empty(block_samples, dtype=np.float32)
+    block_bytes = memoryview(block).cast("B")
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+        try:
+            while True:
+                size = process.stdout.readinto(block_bytes)
+                if not size:
+                    break
+                yield block[: size // block.itemsize]
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
 
-    if process.returncode != 0:
-        raise RuntimeError(
-            "ffmpeg failed to decode the audio file.\n" + process.stderr.decode()
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(
+                "ffmpeg failed to decode the audio file.\n" + stderr.read().decode()
+            )
+
+
+@dataclass(frozen=True, eq=False)
+class WaveformEnvelope:
+    """Per-bucket minimum, maximum and (optionally) RMS of a waveform."""
+
+    lower: np.ndarray
+    upper: np.ndarray
+    rms: np.ndarray | None = None
+
+    @property
+    def size(self) -> int:
+        return self.lower.size
+
+    def normalize(self, gain: float, limit: float = 1.0) -> None:
+        """Scale every row by ``gain`` in place, clipping to ``±limit``."""
+        for values in (self.lower, self.upper, self.rms):
+            if values is not None:
+                np.multiply(values, gain, out=values)
+                np.clip(values, -limit, limit, out=values)
+
+
+class EnvelopeReducer:
+    """Reduce streamed audio blocks into a bounded min/max envelope.
+
+    Each bucket of samples is reduced to its minimum and maximum (plus its mean
+    power when ``rms`` is requested). Buckets start at one sample; whenever the
+    envelope reaches ``capacity`` points, neighbouring buckets are merged and
+    the bucket size doubles, so memory stays bounded no matter how long the
+    audio is.
+    """
+
+    def __init__(self, capacity: int = 1 << 16, rms: bool = False) -> None:
+        self.capacity = capacity
+        self.bucket_samples = 1
+        self.sample_count = 0
+        self.peak = 0.0
+        self._lower = np.empty(capacity, dtype=np.float32)
+        self._upper = np.empty(capacity, dtype=np.float32)
+        self._power = np.empty(capacity, dtype=np.float32) if rms else None
+        self._size = 0
+        self._pending = np.empty(0, dtype=np.float32)
+
+    def _append(
+        self, lower: np.ndarray, upper: np.ndarray, power: np.ndarray | None
+    ) -> None:
+        stored = slice(self._size, self._size + lower.size)
+        self._lower[stored] = lower
+        self._upper[stored] = upper
+        if self._power is not None:
+            self._power[stored] = power
+        self._size += lower.size
+
+    def _halve(self) -> None:
+        pairs, odd = divmod(self._size, 2)
+        even = pairs * 2
+        self._lower[:pairs] = np.minimum(
+            self._lower[0:even:2], self._lower[1:even:2])
+        self._upper[:pairs] = np.maximum(
+            self._upper[0:even:2], self._upper[1:even:2])
+        if self._power is not None:
+            self._power[:pairs] = (
+                self._power[0:even:2] + self._power[1:even:2]) / 2
+        if odd:
+            for values in (self._lower, self._upper, self._power):
+                if values is not None:
+                    values[pairs] = values[self._size - 1]
+        self._size = pairs + odd
+        self.bucket_samples *= 2
+
+    def _reduce(self, buckets: np.ndarray) -> None:
+        power = None
+        if self._power is not None:
+            power = np.mean(np.square(buckets), axis=1)
+        self._append(buckets.min(axis=1), buckets.max(axis=1), power)
+
+    def update(self, block: np.ndarray) -> None:
+        if block.size == 0:
+            return
+        self.sample_count += block.size
+        self.peak = max(self.peak, float(block.max()), float(-block.min()))
+
+        data = np.concatenate([self._pending, block]) if self._pending.size else block
+        # Halve before reducing, so every stored bucket spans bucket_samples.
+        # An odd count is first topped up with one more bucket, so halving
+        # only ever merges whole pairs.
+        while self._size + data.size // self.bucket_samples > self.capacity:
+            if self._size % 2:
+                self._reduce(data[: self.bucket_samples][None, :])
+                data = data[self.bucket_samples :]
+            else:
+                self._halve()
+        full = data.size - data.size % self.bucket_samples
+        if full:
+            self._reduce(data[:full].reshape(-1, self.bucket_samples))
+        self._pending = data[full:].copy()
+
+    def finish(self) -> WaveformEnvelope:
+        if self._pending.size:
+            if self._size == self.capacity:
+                self._halve()
+            self._reduce(self._pending[None, :])
+            self._pending = np.empty(0, dtype=np.float32)
+        size = self._size
+        return WaveformEnvelope(
+            lower=self._lower[:size].copy(),
+            upper=self._upper[:size].copy(),
+            rms=None if self._power is None else np.sqrt(self._power[:size]),
         )
 
-    audio = np.frombuffer(process.stdout, dtype=np.float32)
-    if audio.size == 0:
+
+class LevelMeter:
+    """Stream the level statistics that ``--normalize`` needs.
+
+    Blocks are reduced to a running sum of squares and a histogram of
+    sample magnitudes over ``[0, 1]``, so the RMS level and any magnitude
+    percentile are known after the decode without keeping the samples.
+    """
+
+    BINS = 4096
+
+    def __init__(self) -> None:
+        self.sample_count = 0
+        self.sum_squares = 0.0
+        self.histogram = np.zeros(self.BINS, dtype=np.int64)
+
+    def update(self, block: np.ndarray) -> None:
+        self.sample_count += block.size
+        self.sum_squares += float(np.dot(block, block))
+        magnitudes = np.abs(block)
+        magnitudes *= self.BINS
+        bins = magnitudes.astype(np.intp)
+        np.minimum(bins, self.BINS - 1, out=bins)
+        self.histogram += np.bincount(bins, minlength=self.BINS)
+
+    @property
+    def rms(self) -> float:
+        return (self.sum_squares / max(self.sample_count, 1)) ** 0.5
+
+    def percentile(self, q: float) -> float:
+        """Return the upper edge of the bin holding the ``q``-th percentile."""
+        if not 0 < q <= 100:
+            raise ValueError("percentile must be in (0, 100]")
+        rank = q / 100 * self.sample_count
+        index = int(np.searchsorted(np.cumsum(self.histogram), rank))
+        return min(index + 1, self.BINS) / self.BINS
+
+
+class SpectrumReducer:
+    """Reduce streamed audio blocks into band powers for every video frame.
+
+    Frame ``i`` analyzes a Hann window of ``window_size`` samples centred on
+    ``i / fps`` seconds. The windows that a block completes are gathered from
+    a strided view of the samples and transformed in one batched ``rfft``,
+    then the FFT bins are averaged into ``bands`` log-spaced bands with a
+    single matrix product, so there is no per-frame FFT call and only a block
+    plus one window of samples is held at a time.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        fps: float,
+        bands: int = 48,
+        window_size: int = 2048,
+        min_hz: float = 50.0,
+        max_hz: float = 16_000.0,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.fps = fps
+        self.bands = bands
+        self.window_size = window_size
+        self.hop = sample_rate / fps
+        self.sample_count = 0
+        self._window = np.hanning(window_size).astype(np.float32)
+
+        bins = window_size // 2 + 1
+        bin_hz = sample_rate / window_size
+        edges = np.geomspace(min_hz, min(max_hz, sample_rate / 2), bands + 1)
+        edges = np.rint(edges / bin_hz).astype(np.int64)
+        # Low bands can be narrower than one FFT bin; push the edges apart so
+        # every band owns at least one bin.
+        offsets = np.arange(bands + 1)
+        edges = np.minimum(np.maximum.accumulate(edges - offsets) + offsets, bins)
+        self._weights = np.zeros((bins, bands), dtype=np.float32)
+        for band, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+            if stop > start:
+                # Mean power per bin, tilted +3 dB per octave around 1 kHz so
+                # the treble bars are not dwarfed by the bass.
+                centre_hz = (start + stop) / 2 * bin_hz
+                self._weights[start:stop, band] = centre_hz / 1000 / (stop - start)
+
+        # Leading zeros centre the first window on the first sample.
+        half = window_size // 2
+        self._pending = np.zeros(half, dtype=np.float32)
+        self._offset = -half
+        self._next_frame = 0
+        self._powers: list[np.ndarray] = []
+
+    def _centres(self, frames: np.ndarray) -> np.ndarray:
+        return np.rint(frames * self.hop).astype(np.int64)
+
+    def _analyze(self, data: np.ndarray, frames: np.ndarray) -> None:
+        starts = self._centres(frames) - self.window_size // 2 - self._offset
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.window_size)
+        spectrum = np.fft.rfft(windows[starts] * self._window, axis=1)
+        power = np.square(spectrum.real) + np.square(spectrum.imag)
+        self._powers.append((power @ self._weights).astype(np.float32))
+        self._next_frame = int(frames[-1]) + 1
+
+    def update(self, block: np.ndarray) -> None:
+        if block.size == 0:
+            return
+        self.sample_count += block.size
+        data = np.concatenate([self._pending, block])
+        end = self._offset + data.size
+
+        half = self.window_size // 2
+        last = int((end - half) // self.hop) + 1
+        frames = np.arange(self._next_frame, max(last + 1, self._next_frame))
+        frames = frames[self._centres(frames) + half <= end]
+        if frames.size:
+            self._analyze(data, frames)
+
+        keep = self._centres(np.int64(self._next_frame)) - half - self._offset
+        keep = min(max(int(keep), 0), data.size)
+        self._pending = data[keep:].copy()
+        self._offset += keep
+
+    def finish(self) -> np.ndarray:
+        """Return a ``(frames, bands)`` array of band powers."""
+        frame_count = max(int(self.sample_count / self.sample_rate * self.fps), 1)
+        if self._next_frame < frame_count:
+            # Pad with silence so the last windows are complete.
+            padding = np.zeros(self.window_size, dtype=np.float32)
+            self._analyze(
+                np.concatenate([self._pending, padding]),
+                np.arange(self._next_frame, frame_count),
+            )
+        return np.concatenate(self._powers)[:frame_count]
+
+
+def spectrum_heights(
+    powers: np.ndarray,
+    fps: float,
+    dynamic_range_db: float = 60.0,
+    fall_per_second: float = 1.5,
+) -> np.ndarray:
+    """Map band powers to bar heights in ``[0, 1]`` that rise and fall.
+
+    Powers are converted to decibels below the loudest bands and the top
+    ``dynamic_range_db`` is spread over the bar height. Bars jump up at once
+    and fall at ``fall_per_second`` bar heights per second; the fall is a
+    running maximum of ``height + frame * fall`` minus the same ramp, so the
+    whole table is computed without a per-frame loop.
+    """
+
+    db = 10 * np.log10(powers + 1e-12)
+    reference = np.percentile(db, 99.5)
+    heights = np.clip((db - reference) / dynamic_range_db + 1, 0.0, 1.0)
+    ramp = (np.arange(len(heights)) * (fall_per_second / fps))[:, None]
+    return (np.maximum.accumulate(heights + ramp, axis=0) - ramp).astype(np.float32)
+
+
+@dataclass(frozen=True, eq=False)
+class DecodedAudio:
+    """Envelope and statistics gathered in a single streaming decode."""
+
+    envelope: WaveformEnvelope
+    sample_count: int
+    sample_rate: int
+    peak: float
+    bucket_samples: int = 1
+    meter: LevelMeter | None = None
+
+    @property
+    def duration(self) -> float:
+        return self.sample_count / self.sample_rate
+
+
+def decode_audio(
+    audio_path: str,
+    sample_rate: int,
+    rms: bool = False,
+    audio_track: str | None = None,
+    spectrum: SpectrumReducer | None = None,
+    meter: LevelMeter | None = None,
+) -> DecodedAudio:
+    """Decode audio with ffmpeg straight into a min/max envelope.
+
+    The ffmpeg pipe is read in fixed-size blocks that are reduced as they
+    arrive, so peak memory depends on the block size and the envelope, not on
+    the length of the audio. See :func:`iter_audio_blocks` for
+    ``audio_track``. A ``spectrum`` reducer and a level ``meter`` are fed
+    the same blocks.
+    """
+
+    reducer = EnvelopeReducer(rms=rms)
+    blocks = iter_audio_blocks(audio_path, sample_rate, audio_track=audio_track)
+    for block in blocks:
+        reducer.update(block)
+        if spectrum is not None:
+            spectrum.update(block)
+        if meter is not None:
+            meter.update(block)
+
+    if reducer.sample_count == 0:
         raise ValueError(
             "Decoded audio is empty. Check the input file path and format."
         )
-    return audio
+    return DecodedAudio(
+        envelope=reducer.finish(),
+        sample_count=reducer.sample_count,
+        sample_rate=sample_rate,
+        peak=reducer.peak,
+        bucket_samples=reducer.bucket_samples,
+        meter=meter,
+    )
+
+
+def normalization_gain(
+    audio: DecodedAudio, mode: str = "peak", percentile: float = 99.9
+) -> float:
+    """Return the envelope gain for a :data:`NORMALIZE_MODES` ``mode``.
+
+    ``"rms"`` and ``"percentile"`` need ``audio`` to have been decoded with
+    a :class:`LevelMeter`.
+    """
+    if mode == "peak":
+        return 1 / audio.peak
+    if mode == "rms":
+        return RMS_TARGET / audio.meter.rms
+    if mode == "percentile":
+        return 1 / audio.meter.percentile(percentile)
+    raise ValueError(f"Unknown normalization: {mode}")
+
+
+def hex_to_rgb(hex_color: str) -> tuple[int, int, int]:
+    """Convert a ``#rrggbb`` hex color to an RGB tuple."""
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i: i + 2], 16) for i in (0, 2, 4))
+
+
+def gaussian_blur(image: np.ndarray, sigma: float) -> np.ndarray:
+    """Blur a 2-D array with a separable Gaussian of ``sigma`` pixels.
+
+    Rows and columns are convolved in turn with a kernel cut at three
+    sigmas. Values beyond the edges count as zero, so a blurred mask fades
+    out at the borders.
+    """
+
+    radius = max(int(np.ceil(3 * sigma)), 1)
+    offsets = np.arange(-radius, radius + 1)
+    kernel = np.exp(-0.5 * np.square(offsets / max(sigma, 1e-6)))
+    kernel /= kernel.sum()
+    for axis in (0, 1):
+        size = image.shape[axis]
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (radius, radius)
+        padded = np.pad(image, padding)
+        blurred = np.zeros(image.shape, dtype=np.float32)
+        for start, weight in enumerate(kernel):
+            window = [slice(None), slice(None)]
+            window[axis] = slice(start, start + size)
+            blurred += np.float32(weight) * padded[tuple(window)]
+        image = blurred
+    return image
+
+
+def downsample_envelope(
+    envelope: WaveformEnvelope, target_points: int
+) -> WaveformEnvelope:
+    """Merge envelope buckets down to ``target_points`` without losing peaks.
+
+    Output bucket ``k`` spans exactly ``[k, k + 1) * size / target_points``
+    of the input, so with ``target_points`` set to the axes width every
+    output bucket is one pixel column. It keeps the minimum and maximum of
+    every input bucket overlapping that span, including one straddling
+    either edge, so transients survive however far the envelope is
+    reduced.
+    """
+
+    if envelope.size <= target_points:
+        return envelope
+
+    index = np.arange(target_points + 1, dtype=np.int64) * envelope.size
+    starts = index[:-1] // target_points
+    stops = -(-index[1:] // target_points)
+    lower = np.minimum.reduceat(envelope.lower, starts)
+    upper = np.maximum.reduceat(envelope.upper, starts)
+    # reduceat stops at the next start; fold in the bucket straddling the
+    # right edge when a span does not end on a bucket boundary.
+    straddle = np.flatnonzero(stops[:-1] > starts[1:])
+    lower[straddle] = np.minimum(lower[straddle], envelope.lower[starts[straddle + 1]])
+    upper[straddle] = np.maximum(upper[straddle], envelope.upper[starts[straddle + 1]])
+    rms = None
+    if envelope.rms is not None:
+        counts = np.diff(np.append(starts, envelope.size))
+        rms = np.sqrt(np.add.reduceat(np.square(envelope.rms), starts) / counts)
+        # Dividing by the int64 counts promotes to float64; keep the dtype
+        # the cache stores so hits and misses yield identical envelopes.
+        rms = rms.astype(envelope.rms.dtype)
+    return WaveformEnvelope(lower=lower, upper=upper, rms=rms)
+
+
+def write_peaks(
+    path: str | Path,
+    audio: DecodedAudio,
+    bits: int = 8,
+    min_samples_per_point: int = 256,
+    min_points: int = 512,
+) -> Path:
+    """Write a multi-resolution min/max peaks file for waveform players.
+
+    ``path`` receives every zoom level back to back, finest first, as
+    little-endian signed ``bits``-bit ``(min, max)`` pairs scaled so the
+    audio's peak maps to full scale. Each level halves the previous one
+    until it has at most ``min_points`` pairs, so a level can be read with a
+    single ``np.memmap`` at its offset. A JSON header next to it
+    (``<path>.json``) lists the levels and how to scale them back; its path
+    is returned.
+    """
+
+    path = Path(path)
+    envelope = audio.envelope
+    lower, upper = envelope.lower, envelope.upper
+    bucket_samples = audio.bucket_samples
+    # The decode keeps far finer buckets than a player draws; start at about
+    # one pair per min_samples_per_point samples.
+    while bucket_samples < min_samples_per_point and lower.size > min_points:
+        lower, upper, bucket_samples = *_halve_peaks(lower, upper), bucket_samples * 2
+
+    dtype = np.dtype(PEAKS_FORMATS[bits])
+    scale = np.iinfo(dtype).max
+    gain = scale / audio.peak if audio.peak > 0 else 0.0
+    levels = []
+    offset = 0
+    with open(path, "wb") as handle:
+        while True:
+            pairs = np.empty((lower.size, 2), dtype=dtype)
+            pairs[:, 0] = np.clip(np.floor(lower * gain), -scale, scale)
+            pairs[:, 1] = np.clip(np.ceil(upper * gain), -scale, scale)
+            handle.write(pairs.tobytes())
+            levels.append(
+                {
+                    "samples_per_point": bucket_samples,
+                    "points": int(lower.size),
+                    "offset": offset,
+                }
+            )
+            offset += pairs.nbytes
+            if lower.size <= min_points:
+                break
+            lower, upper = _halve_peaks(lower, upper)
+            bucket_samples *= 2
+
+    header_path = path.with_name(f"{path.name}.json")
+    header_path.write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "dtype": dtype.str,
+                "scale": int(scale),
+                "peak": audio.peak,
+                "sample_rate": audio.sample_rate,
+                "duration": audio.duration,
+                "levels": levels,
+            },
+            indent=2,
+        )
+    )
+    return header_path
+
+
+def _halve_peaks(
+    lower: np.ndarray, upper: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Merge neighbouring min/max pairs; an odd last pair is kept alone."""
+    starts = np.arange(0, lower.size, 2)
+    return np.minimum.reduceat(lower, starts), np.maximum.reduceat(upper, starts)
+
+
+def _children_cpu_seconds() -> float:
+    # resource is POSIX-only; Windows runs report no child CPU time.
+    if sys.platform == "win32":
+        return 0.0
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageProfiler:
+    """Accumulate wall and CPU time per pipeline stage.
+
+    Each stage records its wall time, this process's CPU time and the CPU
+    time of child processes reaped during it (ffmpeg), summed over calls.
+    With ``trace`` every call is also kept as a Chrome trace event. A
+    disabled profiler records nothing, so the pipeline can always take one.
+    Stages may be timed from several threads at once.
+    """
+
+    def __init__(self, enabled: bool = True, trace: bool = False) -> None:
+        self.enabled = enabled
+        self.trace = trace
+        self.stages: dict[str, dict[str, float]] = {}
+        self.counters: dict[str, float] = {}
+        self.events: list[dict] = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        cpu = time.process_time()
+        child_cpu = _children_cpu_seconds()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            cpu = time.process_time() - cpu
+            child_cpu = _children_cpu_seconds() - child_cpu
+            with self._lock:
+                totals = self.stages.setdefault(
+                    name,
+                    {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "child_cpu_s": 0.0},
+                )
+                totals["calls"] += 1
+                totals["wall_s"] += end - start
+                totals["cpu_s"] += cpu
+                totals["child_cpu_s"] += child_cpu
+                if self.trace:
+                    self.events.append({
+                        "name": name,
+                        "ph": "X",
+                        "ts": (start - self._origin) * 1e6,
+                        "dur": (end - start) * 1e6,
+                        "pid": os.getpid(),
+                        "tid": threading.get_native_id(),
+                    })
+
+    def summary(self) -> dict:
+        return {
+            "total_wall_s": time.perf_counter() - self._origin,
+            "stages": self.stages,
+            **self.counters,
+        }
+
+    def write_summary(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.summary(), indent=2))
+
+    def write_trace(self, path: str | Path) -> None:
+        """Write the recorded events for chrome://tracing or Perfetto."""
+        Path(path).write_text(
+            json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"}))
+
+
+NULL_PROFILER = StageProfiler(enabled=False)
+
+
+def profile_frames(
+    frames: Iterator[np.ndarray],
+    frame_count: int,
+    profiler: StageProfiler,
+    log_interval: float = 2.0,
+) -> Iterator[np.ndarray]:
+    """Time every frame pulled from ``frames`` and log live fps and ETA."""
+
+    if not profiler.enabled:
+        yield from frames
+        return
+
+    # Pull frames until the source is exhausted rather than counting them, so
+    # it can shut down (e.g. its worker pool) before the encoder finishes.
+    start = last_log = time.perf_counter()
+    done = 0
+    while True:
+        with profiler.stage("frames.draw"):
+            frame = next(frames, None)
+        if frame is None:
+            return
+        done += 1
+        yield frame
+
+        now = time.perf_counter()
+        if now - last_log >= log_interval or done == frame_count:
+            last_log = now
+            fps = done / (now - start)
+            eta = (frame_count - done) / fps if fps else float("inf")
+            print(
+                f"frame {done}/{frame_count}  {fps:.1f} fps  ETA {eta:.0f}s",
+                file=sys.stderr,
+                flush=True,
+            )
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass(frozen=True, eq=False)
+class CachedEnvelope:
+    """A normalized, downsampled envelope and the duration it spans."""
+
+    envelope: WaveformEnvelope
+    duration: float
+
+
+class EnvelopeCache:
+    """Directory of normalized envelopes keyed by audio content.
+
+    Each entry is a ``.npy`` array stacking the lower, upper and optional RMS
+    rows, loaded memory-mapped, plus a ``.json`` sidecar with the duration.
+    Hits refresh the entry's modification time and stores evict the least
+    recently used entries until the directory fits in ``max_bytes``.
+    Several processes, such as batch workers, may load and store the same
+    entries at once.
+    """
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(
+        content_hash: str,
+        sample_rate: int,
+        points: int,
+        rms: bool,
+        normalize: str = "peak",
+    ) -> str:
+        suffix = "-rms" if rms else ""
+        if normalize != "peak":
+            suffix += f"-{normalize}"
+        return f"{content_hash}-{sample_rate}hz-{points}{suffix}"
+
+    def _paths(self, key: str) -> tuple[Path, Path]:
+        return self.directory / f"{key}.npy", self.directory / f"{key}.json"
+
+    def load(self, key: str) -> CachedEnvelope | None:
+        data_path, meta_path = self._paths(key)
+        try:
+            meta = json.loads(meta_path.read_text())
+            rows = np.load(data_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        os.utime(data_path)
+        os.utime(meta_path)
+        envelope = WaveformEnvelope(
+            lower=rows[0], upper=rows[1], rms=rows[2] if len(rows) > 2 else None
+        )
+        return CachedEnvelope(envelope=envelope, duration=meta["duration"])
+
+    def store(self, key: str, entry: CachedEnvelope) -> None:
+        envelope = entry.envelope
+        rows = [envelope.lower, envelope.upper]
+        if envelope.rms is not None:
+            rows.append(envelope.rms)
+
+        # Write under unique temporary names and rename, so a concurrent
+        # reader never sees a partially written entry and concurrent writers
+        # of the same key never share a file. Entries are a pure function of
+        # their key, so either writer's files may win each rename.
+        data_path, meta_path = self._paths(key)
+        data_fd, data_tmp = tempfile.mkstemp(
+            prefix=f".{key}.", suffix=".npy.tmp", dir=self.directory)
+        meta_tmp = None
+        try:
+            with os.fdopen(data_fd, "wb") as handle:
+                np.save(handle, np.stack(rows).astype(np.float32))
+            meta_fd, meta_tmp = tempfile.mkstemp(
+                prefix=f".{key}.", suffix=".json.tmp", dir=self.directory)
+            with os.fdopen(meta_fd, "w") as handle:
+                json.dump({"duration": entry.duration}, handle)
+            try:
+                os.replace(data_tmp, data_path)
+                os.replace(meta_tmp, meta_path)
+            except OSError:
+                # The rename can fail where another process holds the entry
+                # open; if that writer got there first, the entry is a hit.
+                if self.load(key) is None:
+                    raise
+                return
+        finally:
+            for path in (data_tmp, meta_tmp):
+                if path is not None:
+                    Path(path).unlink(missing_ok=True)
+        self.evict(keep=key)
+
+    def evict(self, keep: str | None = None) -> None:
+        """Delete least recently used entries until the cache fits its cap."""
+        entries = []
+        total = 0
+        for data_path in self.directory.glob("*.npy"):
+            meta_path = data_path.with_suffix(".json")
+            try:
+                stat = data_path.stat()
+                size = stat.st_size + (
+                    meta_path.stat().st_size if meta_path.exists() else 0)
+            except OSError:
+                continue
+            total += size
+            entries.append((stat.st_mtime, size, data_path.stem))
+
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+            total -= size
+
+
+def load_envelope(
+    audio_path: str,
+    sample_rate: int,
+    points: int,
+    rms: bool = False,
+    cache: EnvelopeCache | None = None,
+    content_hash: str | None = None,
+    audio_track: str | None = None,
+    profiler: StageProfiler = NULL_PROFILER,
+    peaks_path: str | Path | None = None,
+    peaks_bits: int = 8,
+    normalize: str = "peak",
+    percentile: float = 99.9,
+) -> CachedEnvelope:
+    """Return the normalized envelope of ``audio_path`` and its duration.
+
+    A ``cache`` hit skips decoding; ``audio_track`` is only written on a
+    miss. ``peaks_path`` always decodes, see :func:`write_peaks`.
+    ``normalize`` picks the reference level, see :func:`normalization_gain`.
+    """
+
+    stored_points = max(points, CACHED_ENVELOPE_POINTS)
+    label = f"p{percentile:g}" if normalize == "percentile" else normalize
+    key = None
+    if cache is not None:
+        with profiler.stage("cache.lookup"):
+            content_hash = content_hash or hash_file(audio_path)
+            key = EnvelopeCache.key(
+                content_hash, sample_rate, stored_points, rms, normalize=label)
+            cached = cache.load(key) if peaks_path is None else None
+        if cached is not None:
+            with profiler.stage("downsample"):
+                envelope = downsample_envelope(cached.envelope, points)
+            return CachedEnvelope(envelope=envelope, duration=cached.duration)
+
+    with profiler.stage("decode"):
+        audio = decode_audio(
+            audio_path,
+            sample_rate,
+            rms=rms,
+            audio_track=audio_track,
+            meter=None if normalize == "peak" else LevelMeter(),
+        )
+    if audio.peak == 0:
+        raise ValueError("The decoded audio appears to be silent.")
+    if peaks_path is not None:
+        with profiler.stage("peaks"):
+            write_peaks(peaks_path, audio, bits=peaks_bits)
+    with profiler.stage("normalize"):
+        audio.envelope.normalize(normalization_gain(audio, normalize, percentile))
+    with profiler.stage("downsample"):
+        stored = downsample_envelope(audio.envelope, target_points=stored_points)
+        envelope = downsample_envelope(stored, target_points=points)
+    if cache is not None:
+        with profiler.stage("cache.store"):
+            cache.store(key, CachedEnvelope(envelope=stored, duration=audio.duration))
+    return CachedEnvelope(envelope=envelope, duration=audio.duration)
+
+
+@dataclass(frozen=True, eq=False)
+class SpectrumAnalysis:
+    """Per-frame bar heights for the bars visual and the duration they span."""
 
+    heights: np.ndarray
+    duration: float
 
-def downsample_waveform(waveform: np.ndarray, target_points: int) -> np.ndarray:
-    """Reduce waveform resolution to speed up rendering without losing shape."""
 
-    if waveform.size <= target_points:
-        return waveform
+def load_spectrum(
+    audio_path: str,
+    sample_rate: int,
+    fps: float,
+    bars: int,
+    audio_track: str | None = None,
+    profiler: StageProfiler = NULL_PROFILER,
+    peaks_path: str | Path | None = None,
+    peaks_bits: int = 8,
+) -> SpectrumAnalysis:
+    """Decode ``audio_path`` into one row of ``bars`` bar heights per frame.
 
-    indices = np.linspace(0, waveform.size - 1, target_points, dtype=np.int64)
-    return waveform[indices]
+    The band powers are computed while the audio streams out of ffmpeg, see
+    :class:`SpectrumReducer`. ``audio_track`` is passed on to
+    :func:`decode_audio` and ``peaks_path`` to :func:`write_peaks`.
+    """
+
+    spectrum = SpectrumReducer(sample_rate, fps, bands=bars)
+    with profiler.stage("decode"):
+        audio = decode_audio(
+            audio_path, sample_rate, audio_track=audio_track, spectrum=spectrum)
+    if audio.peak == 0:
+        raise ValueError("The decoded audio appears to be silent.")
+    if peaks_path is not None:
+        with profiler.stage("peaks"):
+            write_peaks(peaks_path, audio, bits=peaks_bits)
+    with profiler.stage("spectrum"):
+        heights = spectrum_heights(spectrum.finish(), fps)
+    return SpectrumAnalysis(heights=heights, duration=audio.duration)
+
+
+@functools.cache
+def _glow_sprite_type() -> type:
+    """Return the artist class :meth:`WaveformRenderer._glow_image` uses.
+
+    It subclasses matplotlib's ``Artist``, so it is defined on first use
+    rather than at import time, which would import matplotlib with it.
+    """
+    from matplotlib.artist import Artist
+
+    class GlowSprite(Artist):
+        """Draw a bottom-row-first RGBA sprite at pixel ``(x, y)``.
+
+        Setting ``columns`` limits the drawn columns of the sprite.
+        """
+
+        def __init__(self, sprite: np.ndarray, x: int, y: int) -> None:
+            super().__init__()
+            self.sprite = sprite
+            self.x = x
+            self.y = y
+            self.columns = slice(None)
+
+        def draw(self, renderer) -> None:
+            if not self.get_visible():
+                return
+            start, stop, _ = self.columns.indices(self.sprite.shape[1])
+            if stop > start:
+                gc = renderer.new_gc()
+                renderer.draw_image(
+                    gc, self.x + start, self.y, self.sprite[:, start:stop])
+                gc.restore()
+            self.stale = False
+
+    return GlowSprite
 
 
 class WaveformRenderer:
@@ -191,29 +1240,47 @@ class WaveformRenderer:
     MAIN_AXES_RECT = [0.05, 0.1, 0.9, 0.8]
     TITLE_X = 0.05
     TITLE_Y = 0.9
+    Y_LIMITS = (-1.1, 1.1)
 
     def __init__(
         self,
         times: np.ndarray,
-        waveform: np.ndarray,
+        envelope: WaveformEnvelope,
         style: WaveformStyle,
         resolution: tuple[int, int],
         title: str | None,
+        blit: bool = True,
     ) -> None:
         self.times = times
-        self.waveform = waveform
         self.style = style
         self.width, self.height = resolution
+        # One min/max per pixel column, drawn as spans by :meth:`_spans`, so
+        # nothing is interpolated between points inside a column.
+        self.envelope = downsample_envelope(envelope, axes_columns(self.width))
         self.title = title
+        self.blit = blit
         self.dpi = 100
-        self.fig = plt.figure(
+        self._static_background = None
+        self._last_key = None
+        left, _, axes_width, _ = self.MAIN_AXES_RECT
+        self._pixel_aligned = (
+            float(left * self.width).is_integer()
+            and axes_width * self.width == axes_columns(self.width)
+        )
+        self.title_text = None
+        # matplotlib is imported here rather than at module level so --help,
+        # argument errors and the NumPy backend never pay for it.
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(
             figsize=(self.width / self.dpi, self.height / self.dpi), dpi=self.dpi
         )
         self.canvas = FigureCanvasAgg(self.fig)
         self.ax = self.fig.add_axes(self.MAIN_AXES_RECT)
         self.fig.patch.set_facecolor(self.style.background[0])
         self.ax.set_xlim(0, times[-1])
-        self.ax.set_ylim(-1.1, 1.1)
+        self.ax.set_ylim(*self.Y_LIMITS)
         self.ax.axis("off")
         self._setup_background()
         self._setup_waveform_layers()
@@ -226,60 +1293,134 @@ class WaveformRenderer:
             spine.set_visible(False)
         self.ax.set_facecolor(self.style.background[0])
 
+    def _spans(self, lower: np.ndarray, upper: np.ndarray, **kwargs):
+        """Fill each bucket as a vertical span over its own time range.
+
+        Every bucket edge appears twice, so the outline steps straight up or
+        down between neighbours instead of slanting from one extreme to the
+        next, which would leave pale hatching over fast oscillations. A
+        single polygon patch is used because Agg draws the PolyCollection of
+        ``fill_between`` half a pixel to the right of its columns.
+        """
+        edges = np.repeat(np.linspace(0, self.times[-1], lower.size + 1), 2)[1:-1]
+        (polygon,) = self.ax.fill(
+            np.concatenate([edges, edges[::-1]]),
+            np.concatenate([np.repeat(upper, 2), np.repeat(lower, 2)[::-1]]),
+            linewidth=0,
+            **kwargs,
+        )
+        return polygon
+
+    def _band(self, linewidth: float, **kwargs):
+        """Fill the envelope, widened by half of ``linewidth`` points per side.
+
+        The padding gives silent stretches the same visible thickness the
+        old polyline had.
+        """
+        y_min, y_max = self.Y_LIMITS
+        axes_height = self.height * self.MAIN_AXES_RECT[3]
+        pad = linewidth * self.dpi / 72 / 2 * (y_max - y_min) / axes_height
+        return self._spans(
+            self.envelope.lower - pad, self.envelope.upper + pad, **kwargs
+        )
+
     def _setup_waveform_layers(self) -> None:
-        shadow_width = 6 if self.style.glow else 0
-        if shadow_width:
-            self.ax.plot(
-                self.times,
-                self.waveform,
+        self._color_tables = {}
+        if self.style.glow:
+            self._glow_image(
+                6, self._solid_color_table(self.style.line, 1), 0.12, zorder=1)
+        self._band(2, color=self.style.grid, alpha=0.35, zorder=2)
+        if self.envelope.rms is not None:
+            self._spans(
+                -self.envelope.rms,
+                self.envelope.rms,
                 color=self.style.line,
-                linewidth=shadow_width,
-                alpha=0.12,
-                solid_capstyle="round",
-                zorder=1,
+                alpha=0.18,
+                zorder=2,
             )
-        self.ax.plot(
-            self.times,
-            self.waveform,
-            color=self.style.grid,
-            linewidth=2,
-            alpha=0.35,
-            zorder=2,
-        )
 
-        # Setup progress line with gradient if available
+        # Progress layers are one-row color images clipped to the envelope
+        # band, plus a pre-blurred glow sprite. Each frame shows a prefix of
+        # every layer, so no colors or geometry are rebuilt while rendering.
+        axes_width = axes_columns(self.width)
         if self.style.gradient_start and self.style.gradient_end:
-            self.progress_line = None
-            self.progress_glow = None
+            colors = self._gradient_color_table(axes_width)
+            self.progress_layers = [self._progress_band(2.8, colors, zorder=4)]
         else:
-            (self.progress_line,) = self.ax.plot(
-                [],
-                [],
-                color=self.style.line,
-                linewidth=2.8,
-                zorder=4,
-                solid_capstyle="round",
-            )
+            colors = self._solid_color_table(self.style.line, axes_width)
+            self.progress_layers = [self._progress_band(2.8, colors, zorder=4)]
             if self.style.glow:
-                (self.progress_glow,) = self.ax.plot(
-                    [],
-                    [],
-                    color=self.style.accent,
-                    linewidth=9,
-                    alpha=0.06,
-                    zorder=3,
-                    solid_capstyle="round",
+                glow = self._solid_color_table(self.style.accent, axes_width)
+                self.progress_layers.append(
+                    self._glow_image(9, glow, 0.06, zorder=3)
                 )
-            else:
-                self.progress_glow = None
+        for layer in self.progress_layers:
+            layer.set_animated(self.blit)
+
+    def _progress_band(
+        self, linewidth: float, colors: np.ndarray, alpha: float = 1.0, zorder: int = 4
+    ):
+        """Return an image of ``colors`` clipped to the widened envelope band."""
+        band = self._band(linewidth)
+        band_path = band.get_path()
+        band.remove()
+
+        image = self.ax.imshow(
+            colors[None, :, :],
+            extent=(0, self.times[-1], *self.Y_LIMITS),
+            aspect="auto",
+            interpolation="nearest",
+            alpha=alpha,
+            zorder=zorder,
+        )
+        image.set_clip_path(band_path, self.ax.transData)
+        self._color_tables[image] = colors
+        return image
+
+    def _glow_image(
+        self, linewidth: float, colors: np.ndarray, alpha: float, zorder: int
+    ):
+        """Return a sprite artist of the band blurred to ``linewidth`` points.
+
+        ``colors`` holds one RGBA color per axes column, or a single one.
+        """
+        from matplotlib.backends.backend_agg import RendererAgg
+
+        band = self._band(linewidth)
+        band_path = band.get_path()
+        band.remove()
+        renderer = RendererAgg(self.width, self.height, self.dpi)
+        gc = renderer.new_gc()
+        renderer.draw_path(gc, band_path, self.ax.transData, (1.0, 1.0, 1.0, 1.0))
+        gc.restore()
+
+        left, bottom, _, height = self.MAIN_AXES_RECT
+        x = int(left * self.width)
+        top_row = round((1 - bottom - height) * self.height)
+        bottom_row = round((1 - bottom) * self.height)
+        coverage = np.asarray(renderer.buffer_rgba())[
+            top_row:bottom_row, x : x + axes_columns(self.width), 3
+        ]
+        glow = gaussian_blur(coverage / np.float32(255), GLOW_SIGMA * self.dpi / 72)
+
+        sprite = np.empty((*glow.shape, 4), dtype=np.uint8)
+        sprite[..., :3] = np.rint(np.asarray(colors)[..., :3] * 255)
+        sprite[..., 3] = np.rint(np.clip(glow * alpha, 0, 1) * 255)
+        # draw_image expects the bottom row first.
+        sprite = sprite[::-1].copy()
+        artist = _glow_sprite_type()(sprite, x, self.height - bottom_row)
+        artist.set_zorder(zorder)
+        self.ax.add_artist(artist)
+        return artist
 
     def _setup_progress_elements(self) -> None:
         self.playhead = self.ax.axvline(
             0, color=self.style.accent, linewidth=1.5, alpha=0.8, zorder=5
         )
+        self.playhead.set_animated(self.blit)
 
     def _setup_title(self) -> None:
-        self.fig.text(
+        self.title_text = self.fig.text(
             self.TITLE_X,
             self.TITLE_Y,
             self.title,
@@ -289,122 +1430,1511 @@ class WaveformRenderer:
             fontsize=18,
             fontweight="bold",
         )
+        # The title sits above the axes, so it is redrawn over the playhead.
+        self.title_text.set_animated(self.blit)
 
     def make_frame(self, t: float) -> np.ndarray:
-        idx = int(np.searchsorted(self.times, t, side="right"))
-        idx = min(idx, self.waveform.size)
-
-        if self.progress_line is not None:
-            self.progress_line.set_data(self.times[:idx], self.waveform[:idx])
-            if self.progress_glow is not None:
-                self.progress_glow.set_data(
-                    self.times[:idx], self.waveform[:idx])
-        else:
-            # Draw gradient waveform
-            self._draw_gradient_waveform(idx)
+        count = int(progress_columns(self.times, self.width, t))
+        playhead_t = snap_playhead(t, self.times[-1], self.width)
+        self.playhead.set_xdata([playhead_t, playhead_t])
 
-        clamped_t = min(t, self.times[-1])
-        self.playhead.set_xdata([clamped_t, clamped_t])
+        if not self.blit:
+            self._reveal_progress(count)
+            self.canvas.draw()
+        else:
+            key = (count, int(playhead_columns(t, self.times[-1], self.width)))
+            strip = None
+            if self._pixel_aligned:
+                strip = dirty_columns(self._last_key, key, self.width)
+            if strip is None:
+                self._reveal_progress(count)
+                self._blit_animated_artists()
+            else:
+                self._blit_strip(count, *strip)
+            self._last_key = key
+        # The canvas's RGBA buffer is returned as is: it is contiguous, so
+        # the encoder pipes it to ffmpeg as rgba without copying it, whereas
+        # dropping the alpha channel here would cost a strided copy per frame.
+        return np.asarray(self.canvas.buffer_rgba())
 
-        self.canvas.draw()
-        frame = np.asarray(self.canvas.buffer_rgba())[:, :, :3]
-        return frame
+    def _animated_artists(self) -> list:
+        """Return the artists that change between frames, in draw order."""
+        artists = [*self.progress_layers, self.playhead]
+        return sorted(artists, key=lambda artist: artist.get_zorder())
 
-    def _draw_gradient_waveform(self, idx: int) -> None:
-        """Draw waveform with gradient color based on position."""
-        if idx < 2:
-            return
+    def _cache_static_layers(self) -> None:
+        """Rasterize everything that never changes once and keep the pixels.
 
-        times = self.times[:idx]
-        waveform = self.waveform[:idx]
+        Animated artists are excluded from ``canvas.draw()``, so the cached
+        buffer holds only the background, shadow and base waveform.
+        """
+        self.canvas.draw()
+        self._static_background = self.canvas.copy_from_bbox(self.fig.bbox)
+        if self.title_text is not None:
+            # Padded for antialiased glyph edges.
+            self._title_extent = self.title_text.get_window_extent(
+                self.canvas.get_renderer()).padded(2)
 
-        # Create line segments
-        points = np.array([times, waveform]).T.reshape(-1, 1, 2)
-        segments = np.concatenate([points[:-1], points[1:]], axis=1)
+    def _blit_animated_artists(self) -> None:
+        if self._static_background is None:
+            self._cache_static_layers()
+        self.canvas.restore_region(self._static_background)
+        for artist in self._animated_artists():
+            self.ax.draw_artist(artist)
+        if self.title_text is not None:
+            self.fig.draw_artist(self.title_text)
 
-        # Create colors with gradient
-        colors = self._get_gradient_colors(idx)
+    def _blit_strip(self, count: int, left: int, right: int) -> None:
+        """Repaint only the pixel columns ``left:right`` of the last frame.
 
-        # Remove any existing gradient collections
-        for artist in self.ax.collections[:]:
-            artist.remove()
+        The static background is restored inside the strip and every
+        animated artist is redrawn clipped to it, so nothing outside the
+        strip is touched and nothing inside it is blended twice.
+        """
+        # Agg treats the right edge of a restored region as inclusive.
+        self.canvas.restore_region(
+            self._static_background,
+            bbox=(left, 0, right - 1, self.height),
+            xy=(0, 0),
+        )
+        # Progress image columns map one-to-one onto pixel columns, so the
+        # strip is revealed by slicing the images; clipping an image to a box
+        # that cuts through it resamples it differently.
+        ax_left = int(self.MAIN_AXES_RECT[0] * self.width)
+        self._reveal_progress(min(right - ax_left, count), max(left - ax_left, 0))
+        for layer in self.progress_layers:
+            if layer.get_visible():
+                self.ax.draw_artist(layer)
 
-        # Add new line collection with gradient
-        lc = LineCollection(segments, colors=colors, linewidth=2.8, zorder=4)
-        self.ax.add_collection(lc)
+        from matplotlib.transforms import Bbox
 
-    def _get_gradient_colors(self, idx: int) -> list:
-        """Generate gradient colors from start to end."""
-        if idx < 1:
-            return []
+        strip = Bbox.from_extents(left, 0, right, self.height)
+        others = [self.playhead]
+        if self.title_text is not None and strip.overlaps(self._title_extent):
+            others.append(self.title_text)
+        for artist in others:
+            clip_box = artist.get_clip_box()
+            artist.set_clip_box(
+                strip if clip_box is None else Bbox.intersection(strip, clip_box)
+            )
+            artist.draw(self.canvas.get_renderer())
+            artist.set_clip_box(clip_box)
 
-        # Parse hex colors to RGB tuples
-        start_rgb = self._hex_to_rgb(self.style.gradient_start)
-        end_rgb = self._hex_to_rgb(self.style.gradient_end)
+    def _reveal_progress(self, count: int, start: int = 0) -> None:
+        """Cut every progress image to its columns ``start:count``."""
+        for layer in self.progress_layers:
+            layer.set_visible(count > start)
+            if layer not in self._color_tables:
+                layer.columns = slice(start, count)
+                continue
+            colors = self._color_tables[layer]
+            columns = len(colors)
+            if count > start:
+                layer.set_data(colors[None, start:count])
+                layer.set_extent((
+                    start / columns * self.times[-1],
+                    count / columns * self.times[-1],
+                    *self.Y_LIMITS,
+                ))
 
-        colors = []
-        for i in range(idx - 1):
-            # Interpolate between start and end colors
-            t = i / max(idx - 2, 1)
-            r = start_rgb[0] * (1 - t) + end_rgb[0] * t
-            g = start_rgb[1] * (1 - t) + end_rgb[1] * t
-            b = start_rgb[2] * (1 - t) + end_rgb[2] * t
-            colors.append((r / 255.0, g / 255.0, b / 255.0, 1.0))
+    def _solid_color_table(self, color: str, count: int) -> np.ndarray:
+        """Return ``count`` copies of ``color`` as RGBA."""
+        colors = np.ones((count, 4))
+        colors[:, :3] = np.asarray(self._hex_to_rgb(color)) / 255.0
+        return colors
 
+    def _gradient_color_table(self, count: int) -> np.ndarray:
+        """Return ``count`` RGBA colors running from gradient start to end."""
+        start_rgb = np.asarray(self._hex_to_rgb(self.style.gradient_start)) / 255.0
+        end_rgb = np.asarray(self._hex_to_rgb(self.style.gradient_end)) / 255.0
+        position = np.linspace(0.0, 1.0, count)[:, None]
+        colors = np.ones((count, 4))
+        colors[:, :3] = start_rgb * (1 - position) + end_rgb * position
         return colors
 
     def _hex_to_rgb(self, hex_color: str) -> tuple[int, int, int]:
         """Convert hex color to RGB tuple."""
-        hex_color = hex_color.lstrip("#")
-        return tuple(int(hex_color[i: i + 2], 16) for i in (0, 2, 4))
+        return hex_to_rgb(hex_color)
 
 
-def main() -> None:
-    args = parse_args()
-    style = STYLES[args.style]
+def alpha_blend(
+    dst: np.ndarray, color: np.ndarray, coverage: np.ndarray, alpha: float
+) -> None:
+    """Alpha-blend ``color`` over ``dst`` in place (float arrays)."""
+    weight = (coverage * alpha)[..., None]
+    dst += (color - dst) * weight
 
-    audio_path = Path(args.audio)
-    if not audio_path.exists():
-        raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
-    output_path = Path(args.output)
-    if output_path.exists():
-        response = input(
-            f"Output file '{args.output}' already exists. Overwrite (Y/n): "
+def title_coverage(
+    title: str | None, resolution: tuple[int, int], dpi: float
+) -> tuple[tuple[slice, slice], np.ndarray] | None:
+    """Rasterize ``title`` where :class:`WaveformRenderer` places it.
+
+    Returns the row and column slices of its bounding box and its coverage
+    inside that box, or ``None`` when there is nothing to draw.
+    """
+    if not title:
+        return None
+
+    from matplotlib import font_manager
+    from PIL import Image, ImageDraw, ImageFont
+
+    width, height = resolution
+    font_path = font_manager.findfont(font_manager.FontProperties(weight="bold"))
+    font = ImageFont.truetype(font_path, size=round(18 * dpi / 72))
+    mask = Image.new("L", (width, height), 0)
+    x = WaveformRenderer.TITLE_X * width
+    y = (1 - WaveformRenderer.TITLE_Y) * height
+    ImageDraw.Draw(mask).text(
+        (x, y),
+        title,
+        fill=255,
+        font=font,
+        anchor="lm",
+    )
+    bbox = mask.getbbox()
+    if bbox is None:
+        return None
+    x0, y0, x1, y1 = bbox
+    box = (slice(y0, y1), slice(x0, x1))
+    return box, np.asarray(mask, dtype=np.float32)[box] / 255.0
+
+
+class NumpyWaveformRenderer:
+    """Rasterize waveform frames straight into a NumPy array.
+
+    A matplotlib-free backend that mirrors the :class:`WaveformRenderer`
+    layout. Every envelope band is reduced to one vertical span per pixel
+    column with antialiased ends, so the static layers are composited once and
+    each frame only copies cached pixels and alpha-blends the progress
+    columns, playhead and title on top.
+    """
+
+    MAIN_AXES_RECT = WaveformRenderer.MAIN_AXES_RECT
+    Y_LIMITS = WaveformRenderer.Y_LIMITS
+    DPI = 100
+
+    def __init__(
+        self,
+        times: np.ndarray,
+        envelope: WaveformEnvelope,
+        style: WaveformStyle,
+        resolution: tuple[int, int],
+        title: str | None,
+    ) -> None:
+        self.times = times
+        self.style = style
+        self.width, self.height = resolution
+        # One min/max per pixel column; the progress still follows ``times``.
+        self.envelope = downsample_envelope(envelope, axes_columns(self.width))
+        self.title = title
+        self.gradient = bool(style.gradient_start and style.gradient_end)
+        self._frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._last_key = None
+        self._setup_geometry()
+        self._setup_layers()
+        self._setup_title()
+
+    def _points_to_pixels(self, points: float) -> float:
+        return points * self.DPI / 72.0
+
+    def _setup_geometry(self) -> None:
+        left, bottom, width, height = self.MAIN_AXES_RECT
+        self.ax_left = left * self.width
+        self.ax_right = (left + width) * self.width
+        # Rows are measured from the top edge, matching the array layout.
+        self.ax_top = self.height - (bottom + height) * self.height
+        self.ax_bottom = self.height - bottom * self.height
+        self.row_start = max(int(np.floor(self.ax_top)), 0)
+        self.row_stop = min(int(np.ceil(self.ax_bottom)), self.height)
+
+        self.col_start = max(int(np.floor(self.ax_left)), 0)
+        self.col_stop = min(int(np.ceil(self.ax_right)), self.width)
+        self.col_stop = max(self.col_stop, self.col_start + 1)
+        # Each envelope bucket spans an equal share of the axes; a column
+        # shows the bucket under its centre, like Agg filling the spans.
+        centres = np.arange(self.col_start, self.col_stop) + 0.5
+        position = (centres - self.ax_left) / (self.ax_right - self.ax_left)
+        self._column_buckets = np.clip(
+            np.floor(position * self.envelope.size).astype(np.int64),
+            0,
+            self.envelope.size - 1,
         )
-        if response.lower() == "n":
-            print("Cancelled.")
+
+    def _value_to_row(self, values: np.ndarray) -> np.ndarray:
+        y_min, y_max = self.Y_LIMITS
+        return self.ax_bottom - (values - y_min) / (y_max - y_min) * (
+            self.ax_bottom - self.ax_top
+        )
+
+    def _column_extent(self, values: np.ndarray) -> np.ndarray:
+        """Return the rows of a per-bucket curve at every pixel column."""
+        return self._value_to_row(values[self._column_buckets])
+
+    def _band_mask(
+        self, lower: np.ndarray, upper: np.ndarray, linewidth: float = 0.0
+    ) -> np.ndarray:
+        """Coverage of the band between two curves over the axes area.
+
+        The band is widened by half of ``linewidth`` points on each side, the
+        same padding the matplotlib backend applies.
+        """
+        half_width = self._points_to_pixels(linewidth) / 2
+        top = self._column_extent(upper)
+        bottom = self._column_extent(lower)
+        top = np.maximum(top - half_width, self.ax_top)
+        bottom = np.minimum(bottom + half_width, self.ax_bottom)
+
+        rows = np.arange(self.row_start, self.row_stop, dtype=np.float32)[:, None]
+        coverage = np.minimum(rows + 1, bottom[None, :]) - np.maximum(
+            rows, top[None, :]
+        )
+        return np.clip(coverage, 0.0, 1.0).astype(np.float32)
+
+    def _glow_mask(
+        self, lower: np.ndarray, upper: np.ndarray, linewidth: float
+    ) -> np.ndarray:
+        """Coverage of the widened band, softened by :func:`gaussian_blur`."""
+        return gaussian_blur(
+            self._band_mask(lower, upper, linewidth),
+            self._points_to_pixels(GLOW_SIGMA),
+        )
+
+    def _setup_layers(self) -> None:
+        background = np.asarray(
+            hex_to_rgb(self.style.background[0]), dtype=np.float32
+        )
+        canvas = np.empty((self.height, self.width, 3), dtype=np.float32)
+        canvas[:] = background
+
+        axes = canvas[self.row_start : self.row_stop, self.col_start : self.col_stop]
+        lower, upper = self.envelope.lower, self.envelope.upper
+        line_color = np.asarray(hex_to_rgb(self.style.line), dtype=np.float32)
+        if self.style.glow:
+            alpha_blend(axes, line_color, self._glow_mask(lower, upper, 6), 0.12)
+        grid_color = np.asarray(hex_to_rgb(self.style.grid), dtype=np.float32)
+        alpha_blend(axes, grid_color, self._band_mask(lower, upper, 2), 0.35)
+        if self.envelope.rms is not None:
+            rms = self.envelope.rms
+            alpha_blend(axes, line_color, self._band_mask(-rms, rms), 0.18)
+        self._base = np.rint(canvas).astype(np.uint8)
+
+        if self.gradient:
+            start = np.asarray(hex_to_rgb(self.style.gradient_start), np.float32)
+            end = np.asarray(hex_to_rgb(self.style.gradient_end), np.float32)
+            position = np.linspace(0.0, 1.0, axes.shape[1], dtype=np.float32)
+            progress_color = start * (1 - position[:, None]) + end * position[:, None]
+        else:
+            if self.style.glow:
+                accent = np.asarray(hex_to_rgb(self.style.accent), dtype=np.float32)
+                alpha_blend(axes, accent, self._glow_mask(lower, upper, 9), 0.06)
+            progress_color = line_color
+        alpha_blend(axes, progress_color, self._band_mask(lower, upper, 2.8), 1.0)
+        self._progressed = np.rint(canvas).astype(np.uint8)
+
+    def _setup_title(self) -> None:
+        self._title_mask = None
+        title = title_coverage(self.title, (self.width, self.height), self.DPI)
+        if title is None:
             return
+        self._title_box, self._title_mask = title
+        self._title_color = np.asarray(hex_to_rgb(self.style.title), dtype=np.float32)
 
-    waveform = decode_audio(str(audio_path), args.sample_rate)
-    peak = np.max(np.abs(waveform))
-    if peak == 0:
-        raise ValueError("The decoded audio appears to be silent.")
-    waveform = waveform / peak
+    def make_frame(self, t: float) -> np.ndarray:
+        count = int(progress_columns(self.times, self.width, t))
+        key = (count, int(playhead_columns(t, self.times[-1], self.width)))
+        # The previous frame stays in the buffer; only the columns between
+        # the old and new progress and playhead positions are recomposited.
+        strip = dirty_columns(self._last_key, key, self.width)
+        left, right = strip if strip is not None else (0, self.width)
+        self._last_key = key
+
+        frame = self._frame
+        frame[:, left:right] = self._base[:, left:right]
+        self._draw_progress(frame, count, left, right)
+        self._draw_playhead(frame, snap_playhead(t, self.times[-1], self.width))
+        self._draw_title(frame, left, right)
+        return frame
+
+    def _draw_progress(
+        self, frame: np.ndarray, count: int, left: int, right: int
+    ) -> None:
+        # Progress is revealed in whole columns copied from the fully
+        # progressed image, like the matplotlib renderer's color images.
+        rows = slice(self.row_start, self.row_stop)
+        start = max(self.col_start, left)
+        stop = min(self.col_start + count, self.col_stop, right)
+        if stop > start:
+            frame[rows, start:stop] = self._progressed[rows, start:stop]
+
+    def _draw_playhead(self, frame: np.ndarray, t: float) -> None:
+        x = self.ax_left + (t / self.times[-1]) * (self.ax_right - self.ax_left)
+        half_width = self._points_to_pixels(1.5) / 2
+        # Clipped to the axes like matplotlib's axvline.
+        left = max(x - half_width, self.ax_left)
+        right = min(x + half_width, self.ax_right)
+        start = max(int(np.floor(left)), 0)
+        stop = min(int(np.ceil(right)), self.width)
+        if stop <= start:
+            return
+        columns = np.arange(start, stop, dtype=np.float32)
+        coverage = np.clip(
+            np.minimum(columns + 1, right) - np.maximum(columns, left),
+            0.0,
+            1.0,
+        )
+        accent = np.asarray(hex_to_rgb(self.style.accent), dtype=np.float32)
+        region = frame[self.row_start : self.row_stop, start:stop].astype(np.float32)
+        alpha_blend(region, accent, coverage[None, :], 0.8)
+        frame[self.row_start : self.row_stop, start:stop] = np.rint(region)
+
+    def _draw_title(self, frame: np.ndarray, left: int, right: int) -> None:
+        if self._title_mask is None:
+            return
+        rows, columns = self._title_box
+        start = max(columns.start, left)
+        stop = min(columns.stop, right)
+        if stop <= start:
+            return
+        box = (rows, slice(start, stop))
+        mask = self._title_mask[:, start - columns.start : stop - columns.start]
+        region = frame[box].astype(np.float32)
+        alpha_blend(region, self._title_color, mask, 1.0)
+        frame[box] = np.rint(region)
 
-    audio_clip = AudioFileClip(str(audio_path))
-    duration = audio_clip.duration
 
-    downsampled = downsample_waveform(waveform, target_points=6000)
-    times = np.linspace(0, duration, downsampled.size)
+class SpectrumBarsRenderer:
+    """Rasterize an equalizer of frequency bars from precomputed heights.
+
+    ``heights`` holds one row of bar heights in ``[0, 1]`` per video frame
+    (see :func:`load_spectrum`), so drawing a frame is a table lookup plus
+    copying the columns of every bar whose height changed from a lit or an
+    unlit cached image. Bars stand on a baseline above a faded reflection,
+    with a progress track along the bottom of the axes; the title is baked
+    into both cached images.
+    """
+
+    MAIN_AXES_RECT = WaveformRenderer.MAIN_AXES_RECT
+    DPI = NumpyWaveformRenderer.DPI
+    # Rows as fractions of the axes height, measured from its top edge.
+    BAR_TOP = 0.12
+    BASELINE = 0.75
+    REFLECTION_BOTTOM = 0.92
+    TRACK = 0.98
+    # Fraction of each bar's slot that the bar covers.
+    BAR_FILL = 0.7
+
+    def __init__(
+        self,
+        heights: np.ndarray,
+        fps: float,
+        duration: float,
+        style: WaveformStyle,
+        resolution: tuple[int, int],
+        title: str | None,
+    ) -> None:
+        self.heights = heights
+        self.fps = fps
+        self.duration = duration
+        self.style = style
+        self.width, self.height = resolution
+        self.title = title
+        self.gradient = bool(style.gradient_start and style.gradient_end)
+        self._frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._drawn = None
+        self._setup_geometry()
+        self._setup_title()
+        self._setup_layers()
 
-    renderer = WaveformRenderer(
+    def _setup_title(self) -> None:
+        self._title_mask = None
+        title = title_coverage(self.title, (self.width, self.height), self.DPI)
+        if title is None:
+            return
+        self._title_box, self._title_mask = title
+        self._title_color = np.asarray(hex_to_rgb(self.style.title), dtype=np.float32)
+
+    @classmethod
+    def rows(cls, height: int) -> tuple[int, int, int, int]:
+        """Return the bar top, baseline, reflection bottom and track rows."""
+        _, bottom, _, axes_height = cls.MAIN_AXES_RECT
+        top = height * (1 - bottom - axes_height)
+        return tuple(
+            int(round(top + fraction * axes_height * height))
+            for fraction in (
+                cls.BAR_TOP, cls.BASELINE, cls.REFLECTION_BOTTOM, cls.TRACK)
+        )
+
+    @classmethod
+    def pixel_heights(cls, heights: np.ndarray, height: int) -> np.ndarray:
+        """Convert bar heights in ``[0, 1]`` to whole pixel rows."""
+        bar_top, baseline, _, _ = cls.rows(height)
+        return np.rint(heights * (baseline - bar_top)).astype(np.int64)
+
+    def _setup_geometry(self) -> None:
+        self.bar_top, self.baseline, self.reflection_bottom, track = self.rows(
+            self.height)
+        self.track_rows = slice(max(track - 1, 0), min(track + 2, self.height))
+        self.col_start = int(round(self.MAIN_AXES_RECT[0] * self.width))
+        self.col_stop = self.col_start + axes_columns(self.width)
+
+        bars = self.heights.shape[1]
+        slot = (self.col_stop - self.col_start) / bars
+        bar_width = max(int(round(slot * self.BAR_FILL)), 1)
+        starts = self.col_start + np.rint(
+            np.arange(bars) * slot + (slot - bar_width) / 2).astype(np.int64)
+        self.bar_columns = [slice(start, start + bar_width) for start in starts]
+
+    def _setup_layers(self) -> None:
+        background = np.asarray(
+            hex_to_rgb(self.style.background[0]), dtype=np.float32)
+        base = np.empty((self.height, self.width, 3), dtype=np.float32)
+        base[:] = background
+        lit = base.copy()
+
+        if self.gradient:
+            bottom = np.asarray(hex_to_rgb(self.style.gradient_start), np.float32)
+            top = np.asarray(hex_to_rgb(self.style.gradient_end), np.float32)
+        else:
+            bottom = np.asarray(hex_to_rgb(self.style.line), np.float32)
+            top = np.asarray(hex_to_rgb(self.style.accent), np.float32)
+        position = np.linspace(0.0, 1.0, self.baseline - self.bar_top)[:, None]
+        bar_colors = top * (1 - position) + bottom * position
+        reflection_rows = self.reflection_bottom - self.baseline
+        fade = np.linspace(0.3, 0.0, reflection_rows, dtype=np.float32)[:, None]
+        grid = np.asarray(hex_to_rgb(self.style.grid), dtype=np.float32)
+
+        bars = slice(self.bar_top, self.baseline)
+        reflection = slice(self.baseline, self.reflection_bottom)
+        for columns in self.bar_columns:
+            # Unlit bars leave a faint slot so silent bands stay visible.
+            alpha_blend(base[bars, columns], grid, np.ones((1, 1)), 0.35)
+            lit[bars, columns] = bar_colors[:, None]
+            alpha_blend(lit[reflection, columns], bottom, fade, 1.0)
+
+        track = (self.track_rows, slice(self.col_start, self.col_stop))
+        alpha_blend(base[track], grid, np.ones((1, 1)), 1.0)
+        if self.gradient:
+            position = np.linspace(
+                0.0, 1.0, self.col_stop - self.col_start, dtype=np.float32)
+            lit[track] = bottom * (1 - position[:, None]) + top * position[:, None]
+        else:
+            lit[track] = np.asarray(hex_to_rgb(self.style.accent), np.float32)
+
+        if self._title_mask is not None:
+            for canvas in (base, lit):
+                alpha_blend(
+                    canvas[self._title_box], self._title_color, self._title_mask, 1.0)
+        self._base = np.rint(base).astype(np.uint8)
+        self._lit = np.rint(lit).astype(np.uint8)
+
+    def make_frame(self, t: float) -> np.ndarray:
+        index = min(max(int(round(t * self.fps)), 0), len(self.heights) - 1)
+        pixels = self.pixel_heights(self.heights[index], self.height)
+        progress = int(
+            min(t / self.duration, 1.0) * (self.col_stop - self.col_start))
+
+        frame = self._frame
+        if self._drawn is None:
+            frame[:] = self._base
+            self._drawn = (np.zeros_like(pixels), 0)
+        drawn_pixels, drawn_progress = self._drawn
+        self._drawn = (pixels, progress)
+
+        # Only bars whose pixel height changed are copied again.
+        reflection_rows = self.reflection_bottom - self.baseline
+        max_pixels = self.baseline - self.bar_top
+        for bar in np.flatnonzero(pixels != drawn_pixels):
+            columns = self.bar_columns[bar]
+            top = self.baseline - pixels[bar]
+            reflected = self.baseline + pixels[bar] * reflection_rows // max_pixels
+            for rows, source in (
+                (slice(self.bar_top, top), self._base),
+                (slice(top, reflected), self._lit),
+                (slice(reflected, self.reflection_bottom), self._base),
+            ):
+                frame[rows, columns] = source[rows, columns]
+
+        if progress != drawn_progress:
+            start, stop = sorted((drawn_progress, progress))
+            columns = slice(self.col_start + start, self.col_start + stop)
+            source = self._lit if progress > drawn_progress else self._base
+            frame[self.track_rows, columns] = source[self.track_rows, columns]
+        return frame
+
+
+def axes_columns(width: int) -> int:
+    """Return the number of pixel columns spanned by the waveform axes.
+
+    Envelopes are reduced to one min/max bucket per column before drawing.
+    """
+    return max(round(width * WaveformRenderer.MAIN_AXES_RECT[2]), 2)
+
+
+def format_resolution(name: str, short_side: int) -> tuple[int, int]:
+    """Return the even-sized resolution of a :data:`FORMATS` aspect ratio."""
+    ratio_width, ratio_height = FORMATS[name]
+    scale = short_side / min(ratio_width, ratio_height)
+    return 2 * round(ratio_width * scale / 2), 2 * round(ratio_height * scale / 2)
+
+
+def progress_columns(
+    times: np.ndarray, width: int, frame_times: np.ndarray
+) -> np.ndarray:
+    """Return how many axes columns of progress each frame reveals.
+
+    Progress reaches the last envelope point at or before the frame time and
+    is rounded up to whole columns.
+    """
+
+    columns = axes_columns(width)
+    indices = np.minimum(
+        np.searchsorted(times, frame_times, side="right"), times.size)
+    ends = np.where(indices >= 2, times[np.maximum(indices - 1, 0)], 0.0)
+    return np.minimum(np.ceil(ends / times[-1] * columns), columns).astype(np.int64)
+
+
+def playhead_columns(
+    frame_times: np.ndarray, duration: float, width: int
+) -> np.ndarray:
+    """Return the pixel edge nearest to the playhead at each frame time."""
+
+    left, _, axes_width, _ = WaveformRenderer.MAIN_AXES_RECT
+    progress = np.minimum(frame_times, duration) / duration
+    return np.rint((left + progress * axes_width) * width).astype(np.int64)
+
+
+def snap_playhead(t: float, duration: float, width: int) -> float:
+    """Move the playhead time onto its pixel column.
+
+    Snapping makes every frame a pure function of its :func:`frame_keys`
+    entry, so frames with equal keys are identical and can be reused.
+    """
+
+    left, _, axes_width, _ = WaveformRenderer.MAIN_AXES_RECT
+    column = playhead_columns(np.float64(t), duration, width)
+    return float((column / width - left) / axes_width * duration)
+
+
+def frame_keys(times: np.ndarray, width: int, frame_times: np.ndarray) -> np.ndarray:
+    """Return the ``(progress columns, playhead column)`` of every frame.
+
+    The progress columns follow from the envelope index each frame reaches,
+    so two frames with equal keys draw exactly the same pixels.
+    """
+
+    return np.column_stack([
+        progress_columns(times, width, frame_times),
+        playhead_columns(frame_times, times[-1], width),
+    ])
+
+
+# Pixels around the playhead column that its antialiased stroke may touch.
+PLAYHEAD_MARGIN = 3
+
+
+def dirty_columns(
+    previous: tuple[int, int] | None, key: tuple[int, int], width: int
+) -> tuple[int, int] | None:
+    """Return the pixel columns that change between two frame keys.
+
+    The strip spans the newly revealed progress and the old and new playhead
+    positions. ``None`` means the frame cannot be derived from the previous
+    one (the first frame, or progress moving backwards) and must be redrawn.
+    """
+
+    if previous is None:
+        return None
+    previous_count, previous_column = previous
+    count, column = key
+    if count < previous_count or column < previous_column:
+        return None
+
+    ax_left = WaveformRenderer.MAIN_AXES_RECT[0] * width
+    left = min(int(np.floor(ax_left + previous_count)),
+               previous_column - PLAYHEAD_MARGIN)
+    right = max(int(np.ceil(ax_left + count)), column + PLAYHEAD_MARGIN)
+    return max(left, 0), min(right, width)
+
+
+def spectrum_frame_keys(
+    heights: np.ndarray,
+    fps: float,
+    duration: float,
+    resolution: tuple[int, int],
+    frame_times: np.ndarray,
+) -> np.ndarray:
+    """Return the bars visual's equivalent of :func:`frame_keys`.
+
+    Each key is the progress track's column count followed by every bar's
+    pixel height, which is all a :class:`SpectrumBarsRenderer` frame depends
+    on.
+    """
+
+    width, height = resolution
+    indices = np.clip(np.rint(frame_times * fps).astype(np.int64), 0, len(heights) - 1)
+    progress = np.minimum(frame_times / duration, 1.0) * axes_columns(width)
+    return np.column_stack(
+        [
+            progress.astype(np.int64),
+            SpectrumBarsRenderer.pixel_heights(heights[indices], height),
+        ]
+    )
+
+
+def changed_frames(keys: np.ndarray) -> np.ndarray:
+    """Flag the frames whose key differs from the previous frame's."""
+
+    changed = np.ones(len(keys), dtype=bool)
+    changed[1:] = np.any(keys[1:] != keys[:-1], axis=1)
+    return changed
+
+
+RENDERERS = {
+    "matplotlib": WaveformRenderer,
+    "numpy": NumpyWaveformRenderer,
+}
+
+
+def create_renderer(
+    backend: str,
+    times: np.ndarray,
+    envelope: WaveformEnvelope,
+    style: WaveformStyle,
+    resolution: tuple[int, int],
+    title: str | None,
+    blit: bool = True,
+):
+    """Instantiate the renderer registered under ``backend``."""
+
+    if backend == "matplotlib":
+        return WaveformRenderer(
+            times=times,
+            envelope=envelope,
+            style=style,
+            resolution=resolution,
+            title=title,
+            blit=blit,
+        )
+    return RENDERERS[backend](
         times=times,
-        waveform=downsampled,
+        envelope=envelope,
         style=style,
-        resolution=(args.width, args.height),
-        title=args.title,
+        resolution=resolution,
+        title=title,
+    )
+
+
+@dataclass(frozen=True, eq=False)
+class RendererConfig:
+    """Everything needed to build a renderer, picklable for worker processes."""
+
+    backend: str
+    times: np.ndarray
+    envelope: WaveformEnvelope
+    style: WaveformStyle
+    resolution: tuple[int, int]
+    title: str | None
+    blit: bool = True
+
+    def build(self):
+        return create_renderer(
+            self.backend,
+            times=self.times,
+            envelope=self.envelope,
+            style=self.style,
+            resolution=self.resolution,
+            title=self.title,
+            blit=self.blit,
+        )
+
+
+@dataclass(frozen=True, eq=False)
+class SpectrumBarsConfig:
+    """Picklable recipe for a :class:`SpectrumBarsRenderer`."""
+
+    heights: np.ndarray
+    fps: float
+    duration: float
+    style: WaveformStyle
+    resolution: tuple[int, int]
+    title: str | None
+
+    def build(self) -> SpectrumBarsRenderer:
+        return SpectrumBarsRenderer(
+            heights=self.heights,
+            fps=self.fps,
+            duration=self.duration,
+            style=self.style,
+            resolution=self.resolution,
+            title=self.title,
+        )
+
+
+_worker_renderer = None
+
+
+def _init_render_worker(config: RendererConfig | SpectrumBarsConfig) -> None:
+    global _worker_renderer
+    _worker_renderer = config.build()
+
+
+def _render_chunk(frame_times: np.ndarray) -> np.ndarray:
+    frames = None
+    for index, t in enumerate(frame_times):
+        # Renderers reuse their frame buffer, so copy each frame out right away.
+        frame = _worker_renderer.make_frame(t)
+        if frames is None:
+            frames = np.empty((len(frame_times), *frame.shape), dtype=frame.dtype)
+        frames[index] = frame
+    return frames
+
+
+def iter_frames_parallel(
+    config: RendererConfig | SpectrumBarsConfig,
+    frame_times: np.ndarray,
+    changed: np.ndarray,
+    workers: int,
+    chunk_frames: int = 8,
+    context: multiprocessing.context.BaseContext | None = None,
+) -> Iterator[np.ndarray]:
+    """Render frames across worker processes and yield them in timeline order.
+
+    Only frames flagged in ``changed`` are rendered; each is yielded again for
+    the unchanged frames that follow it. The rendered frames are split into
+    chunks of ``chunk_frames`` and each worker builds its own renderer once.
+    At most ``2 * workers`` chunks are in flight, which bounds memory
+    regardless of the video length. ``context`` picks the multiprocessing
+    start method (default: the platform's).
+    """
+
+    rendered = np.flatnonzero(changed)
+    repeats = np.diff(np.append(rendered, len(frame_times)))
+    render_times = frame_times[rendered]
+    chunks = (
+        render_times[start : start + chunk_frames]
+        for start in range(0, len(render_times), chunk_frames)
     )
+    repeat_iter = iter(repeats)
+    with (context or multiprocessing).Pool(
+        workers, initializer=_init_render_worker, initargs=(config,)
+    ) as pool:
+        pending = deque(
+            pool.apply_async(_render_chunk, (chunk,))
+            for _, chunk in zip(range(2 * workers), chunks)
+        )
+        while pending:
+            frames = pending.popleft().get()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_render_chunk, (chunk,)))
+                break
+            for frame, repeat in zip(frames, repeat_iter):
+                for _ in range(repeat):
+                    yield frame
+
+
+def iter_frames(
+    renderer, frame_times: np.ndarray, changed: np.ndarray
+) -> Iterator[np.ndarray]:
+    """Yield a frame per time from one renderer, reusing unchanged frames.
+
+    The renderer keeps its last frame in place, so a frame whose key matches
+    the previous one is yielded again without being rasterized.
+    """
+
+    frame = None
+    for t, render in zip(frame_times, changed):
+        if render:
+            frame = renderer.make_frame(t)
+        yield frame
+
+
+def encode_video(
+    frames: Iterable[np.ndarray],
+    output_path: str,
+    resolution: tuple[int, int],
+    fps: float,
+    audio_path: str | None,
+    preset: str,
+    audio_codec: str = "aac",
+    profiler: StageProfiler = NULL_PROFILER,
+) -> None:
+    """Pipe raw RGB or RGBA frames into one ffmpeg process and mux the audio.
+
+    ffmpeg reads the frames from stdin as ``rawvideo`` and takes the audio
+    from ``audio_path``, so the video and audio are encoded and muxed in one
+    invocation. Pass ``audio_codec="copy"`` when ``audio_path`` already holds
+    an encoded track, or ``audio_path=None`` for a video-only file.
+
+    The pixel format follows the channel count of the first frame, and
+    contiguous frames are written straight from their buffers, so renderers
+    that hand over their own frame buffer are never copied in Python.
+    """
+
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("No frames to encode.")
+    pix_fmt = {3: "rgb24", 4: "rgba"}[first.shape[2]]
+
+    width, height = resolution
+    command = [
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        pix_fmt,
+        "-s",
+        f"{width}x{height}",
+        "-r",
+        str(fps),
+        "-i",
+        "-",
+    ]
+    if audio_path is not None:
+        command += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    command += ["-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p"]
+    if audio_path is not None:
+        command += ["-c:a", audio_codec]
+    command.append(output_path)
+
+    # stderr goes to a file so a chatty ffmpeg can never block on a full pipe.
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=stderr)
+        try:
+            for frame in itertools.chain([first], frames):
+                with profiler.stage("frames.copy"):
+                    data = np.ascontiguousarray(frame)
+                with profiler.stage("encode.write"):
+                    process.stdin.write(data)
+        except BrokenPipeError:
+            pass
+        finally:
+            with profiler.stage("encode.finish"):
+                process.stdin.close()
+                returncode = process.wait()
 
-    video_clip = VideoClip(renderer.make_frame, duration=duration)
-    video_clip = video_clip.with_audio(audio_clip)
-    video_clip.write_videofile(
-        args.output,
+        if returncode != 0:
+            stderr.seek(0)
+            raise RuntimeError(
+                "ffmpeg failed to encode the video.\n" + stderr.read().decode()
+            )
+
+
+@dataclass(frozen=True)
+class RenderStats:
+    frame_count: int
+    rendered_frames: int
+    resumed_frames: int = 0
+
+    @property
+    def reused_frames(self) -> int:
+        return self.frame_count - self.rendered_frames - self.resumed_frames
+
+
+def segment_bounds(frame_count: int, segments: int) -> list[tuple[int, int]]:
+    """Split ``frame_count`` frames into up to ``segments`` contiguous ranges."""
+
+    edges = np.linspace(0, frame_count, segments + 1).round().astype(int)
+    return [
+        (int(start), int(stop))
+        for start, stop in zip(edges[:-1], edges[1:])
+        if stop > start
+    ]
+
+
+@dataclass(frozen=True, eq=False)
+class SegmentJob:
+    """One video-only chunk of a segmented render, picklable for workers."""
+
+    path: str
+    frame_times: np.ndarray
+    changed: np.ndarray
+    resolution: tuple[int, int]
+    fps: int
+    preset: str
+
+
+def _encode_segment(job: SegmentJob) -> SegmentJob:
+    # Encode under a temporary name so a segment only exists once complete.
+    partial = str(Path(job.path).with_suffix(".part.mp4"))
+    frames = iter_frames(_worker_renderer, job.frame_times, job.changed)
+    encode_video(
+        frames,
+        partial,
+        resolution=job.resolution,
+        fps=job.fps,
+        audio_path=None,
+        preset=job.preset,
+    )
+    os.replace(partial, job.path)
+    return job
+
+
+def concat_segments(
+    segment_paths: list[str],
+    output_path: str,
+    audio_path: str,
+    audio_codec: str = "aac",
+) -> None:
+    """Join video-only segments with the concat demuxer and mux the audio."""
+
+    directory = os.path.dirname(os.path.abspath(segment_paths[0]))
+    list_path = os.path.join(directory, "concat.txt")
+    with open(list_path, "w") as handle:
+        for path in segment_paths:
+            quoted = os.path.abspath(path).replace("'", "'\\''")
+            handle.write(f"file '{quoted}'\n")
+
+    command = [
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        list_path,
+        "-i",
+        audio_path,
+        "-map",
+        "0:v:0",
+        "-map",
+        "1:a:0",
+        "-c:v",
+        "copy",
+        "-c:a",
+        audio_codec,
+        output_path,
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            "ffmpeg failed to join the segments.\n" + result.stderr.decode()
+        )
+
+
+def encode_segments(
+    config: RendererConfig | SpectrumBarsConfig,
+    frame_times: np.ndarray,
+    changed: np.ndarray,
+    output_path: str,
+    fps: int,
+    preset: str,
+    audio_path: str,
+    audio_codec: str,
+    segments: int,
+    workers: int,
+    render_key: str,
+    profiler: StageProfiler = NULL_PROFILER,
+    context: multiprocessing.context.BaseContext | None = None,
+) -> RenderStats:
+    """Encode the timeline as independent segments, then join them.
+
+    Segments are encoded in parallel by ``workers`` processes into
+    ``<output>.segments/``, which records ``render_key`` so segments left by
+    an interrupted render with the same audio and settings are reused. The
+    directory is removed once the joined video is written. ``context`` is
+    passed on as in :func:`iter_frames_parallel`.
+    """
+
+    segment_dir = Path(output_path).with_suffix(".segments")
+    segment_dir.mkdir(exist_ok=True)
+    manifest_path = segment_dir / "segments.json"
+    try:
+        previous_key = json.loads(manifest_path.read_text()).get("key")
+    except (OSError, ValueError):
+        previous_key = None
+    if previous_key != render_key:
+        for stale in segment_dir.glob("segment-*.mp4"):
+            stale.unlink()
+        manifest_path.write_text(json.dumps({"key": render_key}))
+
+    jobs = []
+    paths = []
+    resumed_frames = 0
+    for index, (start, stop) in enumerate(segment_bounds(len(frame_times), segments)):
+        path = segment_dir / f"segment-{index:04d}.mp4"
+        paths.append(str(path))
+        if path.exists():
+            resumed_frames += stop - start
+            continue
+        # Each segment starts from a fully rendered frame.
+        segment_changed = changed[start:stop].copy()
+        segment_changed[0] = True
+        jobs.append(
+            SegmentJob(
+                path=str(path),
+                frame_times=frame_times[start:stop],
+                changed=segment_changed,
+                resolution=config.resolution,
+                fps=fps,
+                preset=preset,
+            )
+        )
+    if resumed_frames:
+        print(
+            f"Resuming: {len(paths) - len(jobs)} of {len(paths)} segments "
+            f"already encoded in {segment_dir}",
+            file=sys.stderr,
+        )
+
+    if jobs:
+        with profiler.stage("segments.encode"), (context or multiprocessing).Pool(
+            max(1, min(workers, len(jobs))),
+            initializer=_init_render_worker,
+            initargs=(config,),
+        ) as pool:
+            for done, job in enumerate(
+                pool.imap_unordered(_encode_segment, jobs), start=1
+            ):
+                if profiler.enabled:
+                    print(
+                        f"segment {done}/{len(jobs)} {Path(job.path).name}",
+                        file=sys.stderr,
+                    )
+    with profiler.stage("segments.concat"):
+        concat_segments(paths, output_path, audio_path, audio_codec)
+    shutil.rmtree(segment_dir)
+    return RenderStats(
+        frame_count=len(frame_times),
+        rendered_frames=sum(int(np.count_nonzero(job.changed)) for job in jobs),
+        resumed_frames=resumed_frames,
+    )
+
+
+def render_waveform_video(
+    audio_path: str,
+    output_path: str,
+    style: WaveformStyle,
+    resolution: tuple[int, int] = (1280, 720),
+    **options,
+) -> RenderStats:
+    """Analyze ``audio_path`` and encode its waveform video to ``output_path``.
+
+    A single-output :func:`render_formats`; ``options`` are its keyword
+    arguments.
+    """
+    return render_formats(
+        audio_path, {output_path: resolution}, style, **options)[output_path]
+
+
+def render_formats(
+    audio_path: str,
+    outputs: dict[str, tuple[int, int]],
+    style: WaveformStyle,
+    fps: int = 30,
+    sample_rate: int = 44_100,
+    title: str | None = None,
+    preset: str = "medium",
+    backend: str = "matplotlib",
+    rms: bool = False,
+    workers: int = 1,
+    blit: bool = True,
+    cache: EnvelopeCache | None = None,
+    content_hash: str | None = None,
+    profiler: StageProfiler = NULL_PROFILER,
+    segments: int = 1,
+    visual: str = "waveform",
+    bars: int = 48,
+    peaks_path: str | None = None,
+    peaks_bits: int = 8,
+    normalize: str = "peak",
+    normalize_percentile: float = 99.9,
+) -> dict[str, RenderStats]:
+    """Analyze ``audio_path`` once and encode a video per ``outputs`` entry.
+
+    ``outputs`` maps each output path to its resolution. With several
+    outputs, each draws its frames in its own worker process. The other
+    arguments mirror the command-line options.
+    """
+
+    # Worker pools forked from one output's thread would inherit the stdin
+    # pipes of the other outputs' ffmpeg processes, keeping them open past
+    # their last frame. Forkserver workers start without those descriptors.
+    context = multiprocessing.get_context("forkserver") if len(outputs) > 1 else None
+    with tempfile.TemporaryDirectory(prefix="waveform-") as scratch:
+        audio_track = os.path.join(scratch, "audio.m4a")
+        if visual == "bars":
+            spectrum = load_spectrum(
+                audio_path,
+                sample_rate,
+                fps=fps,
+                bars=bars,
+                audio_track=audio_track,
+                profiler=profiler,
+                peaks_path=peaks_path,
+                peaks_bits=peaks_bits,
+            )
+            duration = spectrum.duration
+        else:
+            points = {
+                path: axes_columns(width)
+                for path, (width, _) in outputs.items()
+            }
+            # Load the envelope as the cache stores it; every output then
+            # reduces it to its own width, like load_envelope would.
+            analysis = load_envelope(
+                audio_path,
+                sample_rate,
+                points=max(CACHED_ENVELOPE_POINTS, *points.values()),
+                rms=rms,
+                cache=cache,
+                content_hash=content_hash,
+                audio_track=audio_track,
+                profiler=profiler,
+                peaks_path=peaks_path,
+                peaks_bits=peaks_bits,
+                normalize=normalize,
+                percentile=normalize_percentile,
+            )
+            duration = analysis.duration
+        frame_times = np.arange(int(duration * fps)) / fps
+        shared_track = os.path.exists(audio_track)
+        if segments > 1:
+            content_hash = content_hash or hash_file(audio_path)
+
+        def render_output(output_path: str) -> RenderStats:
+            resolution = outputs[output_path]
+            if visual == "bars":
+                config = SpectrumBarsConfig(
+                    heights=spectrum.heights,
+                    fps=fps,
+                    duration=duration,
+                    style=style,
+                    resolution=resolution,
+                    title=title,
+                )
+                keys = spectrum_frame_keys(
+                    spectrum.heights, fps, duration, resolution, frame_times)
+            else:
+                with profiler.stage("downsample"):
+                    envelope = downsample_envelope(
+                        analysis.envelope, points[output_path])
+                times = np.linspace(0, duration, envelope.size)
+                config = RendererConfig(
+                    backend=backend,
+                    times=times,
+                    envelope=envelope,
+                    style=style,
+                    resolution=resolution,
+                    title=title,
+                    blit=blit,
+                )
+                keys = frame_keys(times, resolution[0], frame_times)
+            changed = changed_frames(keys)
+            if segments > 1:
+                render_key = hashlib.sha256(
+                    json.dumps(
+                        [
+                            content_hash,
+                            asdict(style),
+                            list(resolution),
+                            fps,
+                            sample_rate,
+                            title,
+                            preset,
+                            backend,
+                            rms,
+                            normalize,
+                            normalize_percentile,
+                            segments,
+                            visual,
+                            bars,
+                        ]
+                    ).encode()
+                ).hexdigest()
+                return encode_segments(
+                    config,
+                    frame_times,
+                    changed,
+                    output_path,
+                    fps=fps,
+                    preset=preset,
+                    audio_path=audio_track if shared_track else audio_path,
+                    audio_codec="copy" if shared_track else "aac",
+                    segments=segments,
+                    workers=workers,
+                    render_key=render_key,
+                    profiler=profiler,
+                    context=context,
+                )
+
+            if workers > 1 or context is not None:
+                # Workers build their own renderers, so their setup time
+                # shows up in frames.draw. With several outputs even one
+                # worker gets its own process, so the outputs rasterize in
+                # parallel instead of taking turns holding the GIL.
+                frames = iter_frames_parallel(
+                    config, frame_times, changed, workers, context=context)
+            else:
+                with profiler.stage("renderer.build"):
+                    renderer = config.build()
+                frames = iter_frames(renderer, frame_times, changed)
+            profiled = profile_frames(frames, len(frame_times), profiler)
+
+            try:
+                with profiler.stage("pipeline"):
+                    encode_video(
+                        profiled,
+                        output_path,
+                        resolution=resolution,
+                        fps=fps,
+                        audio_path=audio_track if shared_track else audio_path,
+                        preset=preset,
+                        audio_codec="copy" if shared_track else "aac",
+                        profiler=profiler,
+                    )
+            finally:
+                profiled.close()
+                frames.close()
+            return RenderStats(
+                frame_count=len(frame_times),
+                rendered_frames=int(np.count_nonzero(changed)),
+            )
+
+        if len(outputs) == 1:
+            stats = {path: render_output(path) for path in outputs}
+        else:
+            with ThreadPoolExecutor(max_workers=len(outputs)) as executor:
+                stats = dict(zip(outputs, executor.map(render_output, outputs)))
+    profiler.counters.update(
+        frames=sum(stat.frame_count for stat in stats.values()),
+        rendered_frames=sum(stat.rendered_frames for stat in stats.values()),
+    )
+    return stats
+
+
+def render_preview(
+    audio_path: str,
+    output_path: str,
+    style: WaveformStyle,
+    resolution: tuple[int, int] = (1280, 720),
+    sample_rate: int = 44_100,
+    title: str | None = None,
+    backend: str = "matplotlib",
+    rms: bool = False,
+    blit: bool = True,
+    cache: EnvelopeCache | None = None,
+    keyframes: int = 8,
+    preview_width: int = 480,
+    animation: str | None = None,
+    animation_fps: float = 4.0,
+    visual: str = "waveform",
+    bars: int = 48,
+    fps: int = 30,
+    normalize: str = "peak",
+    normalize_percentile: float = 99.9,
+) -> list[Path]:
+    """Write a poster, a keyframe sprite sheet and optionally an animation.
+
+    Frames come from the same renderer and style as the full video and are
+    downscaled to ``preview_width``, so the preview shows the final layout
+    without paying for the per-frame rendering and x264 encode of the whole
+    timeline. Files are named after ``output_path`` and their paths returned.
+    ``fps`` is the frame rate the bars visual analyzes the audio at.
+    """
+
+    from PIL import Image
+
+    if visual == "bars":
+        spectrum = load_spectrum(audio_path, sample_rate, fps=fps, bars=bars)
+        duration = spectrum.duration
+        renderer = SpectrumBarsConfig(
+            heights=spectrum.heights,
+            fps=fps,
+            duration=duration,
+            style=style,
+            resolution=resolution,
+            title=title,
+        ).build()
+    else:
+        analysis = load_envelope(
+            audio_path,
+            sample_rate,
+            points=axes_columns(resolution[0]),
+            rms=rms,
+            cache=cache,
+            normalize=normalize,
+            percentile=normalize_percentile,
+        )
+        duration = analysis.duration
+        times = np.linspace(0, duration, analysis.envelope.size)
+        renderer = RendererConfig(
+            backend=backend,
+            times=times,
+            envelope=analysis.envelope,
+            style=style,
+            resolution=resolution,
+            title=title,
+            blit=blit,
+        ).build()
+
+    width, height = resolution
+    scale = min(preview_width / width, 1.0)
+    tile_size = (max(round(width * scale), 1), max(round(height * scale), 1))
+
+    def still(t: float) -> Image.Image:
+        # Renderers may return RGBA; previews are plain RGB.
+        frame = renderer.make_frame(t)[:, :, :3]
+        return Image.fromarray(np.ascontiguousarray(frame))
+
+    def tile(t: float) -> Image.Image:
+        # A box reduction before LANCZOS keeps large frames cheap to shrink.
+        return still(t).resize(tile_size, Image.LANCZOS, reducing_gap=2.0)
+
+    stem = Path(output_path).with_suffix("")
+    written = []
+
+    poster_path = stem.with_name(f"{stem.name}.poster.png")
+    still(duration).save(poster_path)
+    written.append(poster_path)
+
+    columns = min(keyframes, 4)
+    rows = -(-keyframes // columns)
+    sheet = Image.new("RGB", (columns * tile_size[0], rows * tile_size[1]))
+    for index, t in enumerate(np.linspace(0, duration, keyframes)):
+        row, column = divmod(index, columns)
+        sheet.paste(tile(t), (column * tile_size[0], row * tile_size[1]))
+    sprites_path = stem.with_name(f"{stem.name}.sprites.png")
+    sheet.save(sprites_path)
+    written.append(sprites_path)
+
+    if animation is not None:
+        frames = [tile(t) for t in np.arange(0, duration, 1 / animation_fps)]
+        animation_path = stem.with_name(f"{stem.name}.preview.{animation}")
+        frames[0].save(
+            animation_path,
+            save_all=True,
+            append_images=frames[1:],
+            duration=round(1000 / animation_fps),
+            loop=0,
+        )
+        written.append(animation_path)
+    return written
+
+
+def print_profile(summary: dict) -> None:
+    """Print a per-stage table from a :class:`StageProfiler` summary."""
+
+    print(f"{'stage':<16}{'calls':>8}{'wall s':>10}{'cpu s':>10}{'child s':>10}")
+    for name, totals in summary["stages"].items():
+        print(
+            f"{name:<16}{totals['calls']:>8}{totals['wall_s']:>10.2f}"
+            f"{totals['cpu_s']:>10.2f}{totals['child_cpu_s']:>10.2f}"
+        )
+    print(f"total wall time {summary['total_wall_s']:.2f}s")
+
+
+def main() -> None:
+    args = parse_args()
+    style = STYLES[args.style]
+
+    audio_path = Path(args.audio)
+    if not audio_path.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+    cache = None
+    if args.cache_dir:
+        cache = EnvelopeCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+
+    output_path = Path(args.output)
+    outputs = {args.output: (args.width, args.height)}
+    if args.formats:
+        short_side = min(args.width, args.height)
+        outputs = {
+            str(output_path.with_stem(f"{output_path.stem}-{name}")):
+                format_resolution(name, short_side)
+            for name in args.formats
+        }
+
+    if args.preview:
+        for output, resolution in outputs.items():
+            written = render_preview(
+                str(audio_path),
+                output,
+                style=style,
+                resolution=resolution,
+                sample_rate=args.sample_rate,
+                title=args.title,
+                backend=args.backend,
+                rms=args.rms,
+                blit=args.blit,
+                normalize=args.normalize,
+                normalize_percentile=args.normalize_percentile,
+                cache=cache,
+                keyframes=args.preview_frames,
+                preview_width=args.preview_width,
+                animation=args.preview_animation,
+                animation_fps=args.preview_fps,
+                visual=args.visual,
+                bars=args.bars,
+                fps=args.fps,
+            )
+            for path in written:
+                print(f"Wrote {path}")
+        return
+
+    existing = [output for output in outputs if Path(output).exists()]
+    if existing and not args.overwrite:
+        response = input(
+            f"Output file '{existing[0]}' already exists. Overwrite (Y/n): "
+        )
+        if response.lower() == "n":
+            print("Cancelled.")
+            return
+
+    profiler = StageProfiler(
+        enabled=args.profile or bool(args.trace), trace=bool(args.trace))
+    peaks_path = output_path.with_suffix(".peaks")
+    all_stats = render_formats(
+        str(audio_path),
+        outputs,
+        style=style,
         fps=args.fps,
-        codec="libx264",
-        audio_codec="aac",
+        sample_rate=args.sample_rate,
+        title=args.title,
         preset=args.preset,
+        backend=args.backend,
+        rms=args.rms,
+        workers=args.workers,
+        blit=args.blit,
+        normalize=args.normalize,
+        normalize_percentile=args.normalize_percentile,
+        cache=cache,
+        profiler=profiler,
+        segments=args.segments,
+        visual=args.visual,
+        bars=args.bars,
+        peaks_path=str(peaks_path) if args.peaks else None,
+        peaks_bits=args.peaks_bits,
     )
+    for output, stats in all_stats.items():
+        resumed = (
+            f", {stats.resumed_frames} from finished segments"
+            if stats.resumed_frames
+            else ""
+        )
+        print(
+            f"Wrote {output} ({stats.rendered_frames} frames rendered, "
+            f"{stats.reused_frames} unchanged frames reused{resumed})"
+        )
+    if args.peaks:
+        print(f"Wrote {peaks_path} and {peaks_path}.json")
+
+    if profiler.enabled:
+        summary_path = output_path.with_suffix(".profile.json")
+        profiler.write_summary(summary_path)
+        print_profile(profiler.summary())
+        print(f"Wrote {summary_path}")
+    if args.trace:
+        profiler.write_trace(args.trace)
+        print(f"Wrote {args.trace}")
 
 
 if __name__ == "__main__":
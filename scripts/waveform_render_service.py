@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""Serve waveform video renders from warm worker processes over local HTTP.
+
+Workers are forked from a server that has already imported
+generate_waveform_video.py, NumPy and matplotlib, and then render jobs one
+after another, so short renders no longer pay interpreter and import
+startup. Jobs are accepted into a
+bounded queue; when it is full, submissions are refused with ``503`` until
+workers catch up.
+
+Endpoints
+---------
+POST   /jobs        Submit a job (JSON body, see below); returns its id
+GET    /jobs        List jobs and the queue length
+GET    /jobs/<id>   Status of one job
+DELETE /jobs/<id>   Cancel a queued or running job
+
+A job body needs ``audio`` and ``output`` paths, resolved on the server, and
+may set ``style``, ``width``, ``height``, ``fps``, ``title``, ``sample_rate``,
+``preset``, ``backend``, ``rms`` and ``overwrite``.
+
+Examples
+--------
+python scripts/waveform_render_service.py --workers 4 --cache-dir .cache/waveforms
+
+curl -s localhost:8765/jobs -d '{"audio": "in.mp3", "output": "out.mp4", "style": "sunset", "title": "Demo"}'
+curl -s localhost:8765/jobs/3f2c9a1e7b0d
+curl -s -X DELETE localhost:8765/jobs/3f2c9a1e7b0d
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import generate_waveform_video as gwv
+
+FINISHED = ("done", "failed", "cancelled")
+KEEP_FINISHED = 1000
+
+
+@dataclass(frozen=True)
+class JobRequest:
+    """Parameters of one render, validated from a submitted JSON body."""
+
+    audio: str
+    output: str
+    style: str = "neon"
+    width: int = 1280
+    height: int = 720
+    fps: int = 30
+    title: str | None = None
+    sample_rate: int = 44_100
+    preset: str = "medium"
+    backend: str = "matplotlib"
+    rms: bool = False
+    overwrite: bool = False
+
+    @classmethod
+    def from_json(cls, body: dict) -> JobRequest:
+        if not isinstance(body, dict):
+            raise ValueError("Expected a JSON object")
+        unknown = set(body) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        for name in ("audio", "output"):
+            if not isinstance(body.get(name), str):
+                raise ValueError(f"'{name}' must be a path")
+        request = cls(**body)
+
+        for name in ("width", "height", "fps", "sample_rate"):
+            value = getattr(request, name)
+            if not isinstance(value, int) or isinstance(value, bool) or value <= 0:
+                raise ValueError(f"'{name}' must be a positive integer")
+        for name in ("rms", "overwrite"):
+            if not isinstance(getattr(request, name), bool):
+                raise ValueError(f"'{name}' must be true or false")
+        if not isinstance(request.preset, str):
+            raise ValueError("'preset' must be a string")
+        if request.title is not None and not isinstance(request.title, str):
+            raise ValueError("'title' must be a string or null")
+        if request.style not in gwv.STYLES:
+            raise ValueError(f"Unknown style '{request.style}'")
+        if request.backend not in gwv.RENDERERS:
+            raise ValueError(f"Unknown backend '{request.backend}'")
+
+        audio = Path(request.audio).resolve()
+        output = Path(request.output).resolve()
+        if not audio.is_file():
+            raise ValueError(f"Audio file not found: {audio}")
+        if output.exists() and not request.overwrite:
+            raise ValueError(f"Output exists (set 'overwrite'): {output}")
+        return cls(**{**asdict(request), "audio": str(audio), "output": str(output)})
+
+
+@dataclass
+class Job:
+    id: str
+    request: JobRequest
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    stats: dict | None = None
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+
+    def to_json(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "request": asdict(self.request),
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "stats": self.stats,
+        }
+
+
+def _worker_main(conn, cache_dir: str | None, cache_bytes: int) -> None:
+    """Render requests received on ``conn`` until ``None`` arrives."""
+
+    # Own process group, so cancelling a job also stops its ffmpeg children,
+    # and SIGTERM unwinds normally so temporary files are cleaned up.
+    os.setpgrp()
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cache = gwv.EnvelopeCache(cache_dir, cache_bytes) if cache_dir else None
+    while True:
+        request = conn.recv()
+        if request is None:
+            return
+        try:
+            stats = gwv.render_waveform_video(
+                request.audio,
+                request.output,
+                style=gwv.STYLES[request.style],
+                resolution=(request.width, request.height),
+                fps=request.fps,
+                sample_rate=request.sample_rate,
+                title=request.title,
+                preset=request.preset,
+                backend=request.backend,
+                rms=request.rms,
+                cache=cache,
+            )
+        except Exception as exc:  # Report the failure and take the next job
+            conn.send(("failed", f"{type(exc).__name__}: {exc}"))
+        else:
+            conn.send(("done", asdict(stats)))
+
+
+class WorkerSlot:
+    """One warm worker process, restarted if a job is cancelled or it dies."""
+
+    def __init__(self, context, cache_dir: str | None, cache_bytes: int) -> None:
+        self.context = context
+        self.cache_dir = cache_dir
+        self.cache_bytes = cache_bytes
+        self._start()
+
+    def _start(self) -> None:
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cache_dir, self.cache_bytes),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def _restart(self) -> None:
+        if self.process.is_alive():
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                os.killpg(self.process.pid, signal.SIGKILL)
+        self.process.join()
+        self.conn.close()
+        self._start()
+
+    def _lost_worker(self) -> tuple[str, str]:
+        self.process.join(timeout=1)
+        code = self.process.exitcode
+        self._restart()
+        return "failed", f"Worker exited with code {code}"
+
+    def run(self, job: Job) -> tuple[str, object]:
+        """Render ``job`` and return its final status and stats or error."""
+
+        # A worker that died while idle leaves a broken pipe behind.
+        if not self.process.is_alive():
+            self._restart()
+        try:
+            self.conn.send(job.request)
+        except OSError:
+            return self._lost_worker()
+        while not self.conn.poll(0.2):
+            if job.cancel_requested.is_set():
+                self._restart()
+                Path(job.request.output).unlink(missing_ok=True)
+                return "cancelled", None
+            if not self.process.is_alive():
+                break
+        try:
+            return self.conn.recv()
+        except (OSError, EOFError):
+            return self._lost_worker()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.join()
+
+
+class RenderService:
+    """Bounded job queue drained by a fixed set of warm worker processes."""
+
+    def __init__(
+        self, workers: int, queue_size: int, cache_dir: str | None, cache_bytes: int
+    ) -> None:
+        # Workers fork from a server that has already imported the renderer,
+        # so even a restarted worker starts warm. The renderer imports
+        # matplotlib lazily, so its modules are preloaded explicitly.
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(
+            [
+                "generate_waveform_video",
+                "matplotlib.figure",
+                "matplotlib.backends.backend_agg",
+            ]
+        )
+        self.jobs: dict[str, Job] = {}
+        self.lock = threading.Lock()
+        self.pending: queue.Queue[Job | None] = queue.Queue(maxsize=queue_size)
+        self.slots = [
+            WorkerSlot(context, cache_dir, cache_bytes) for _ in range(workers)
+        ]
+        self.dispatchers = [
+            threading.Thread(target=self._dispatch, args=(slot,), daemon=True)
+            for slot in self.slots
+        ]
+        for dispatcher in self.dispatchers:
+            dispatcher.start()
+
+    def submit(self, request: JobRequest) -> Job:
+        """Queue a job, raising :class:`queue.Full` when the queue is full."""
+
+        job = Job(id=uuid.uuid4().hex[:12], request=request)
+        with self.lock:
+            self.pending.put_nowait(job)
+            self.jobs[job.id] = job
+            self._prune()
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def all_jobs(self) -> list[Job]:
+        with self.lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Job | None:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return job
+            job.cancel_requested.set()
+            if job.status == "queued":
+                self._finish(job, "cancelled")
+            return job
+
+    def shutdown(self) -> None:
+        for job in self.all_jobs():
+            self.cancel(job.id)
+        for _ in self.dispatchers:
+            self.pending.put(None)
+        for dispatcher in self.dispatchers:
+            dispatcher.join()
+        for slot in self.slots:
+            slot.stop()
+
+    def _dispatch(self, slot: WorkerSlot) -> None:
+        while True:
+            job = self.pending.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.status != "queued":
+                    continue
+                job.status = "running"
+                job.started_at = time.time()
+            try:
+                status, result = slot.run(job)
+            except Exception as exc:  # Fail the job, keep serving the queue
+                status, result = "failed", f"{type(exc).__name__}: {exc}"
+            with self.lock:
+                self._finish(
+                    job,
+                    status,
+                    error=result if status == "failed" else None,
+                    stats=result if status == "done" else None,
+                )
+
+    def _finish(
+        self, job: Job, status: str, error: str | None = None, stats: dict | None = None
+    ) -> None:
+        job.status = status
+        job.error = error
+        job.stats = stats
+        job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond :data:`KEEP_FINISHED`."""
+        finished = [job for job in self.jobs.values() if job.status in FINISHED]
+        for job in finished[: max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job.id]
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service: RenderService
+
+    def _send_json(self, status: HTTPStatus, payload: dict, headers=()) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id(self) -> str | None:
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "jobs":
+            return parts[1]
+        return None
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/jobs":
+            self._send_json(
+                HTTPStatus.OK,
+                {
+                    "jobs": [job.to_json() for job in self.service.all_jobs()],
+                    "queued": self.service.pending.qsize(),
+                },
+            )
+            return
+        job_id = self._job_id()
+        job = self.service.get(job_id) if job_id else None
+        if job is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "No such job"})
+            return
+        self._send_json(HTTPStatus.OK, job.to_json())
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "Unknown endpoint"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = JobRequest.from_json(json.loads(self.rfile.read(length)))
+        except (TypeError, ValueError) as exc:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
+            return
+        try:
+            job = self.service.submit(request)
+        except queue.Full:
+            self._send_json(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                {"error": "Queue is full, retry later"},
+                headers=[("Retry-After", "1")],
+            )
+            return
+        self._send_json(HTTPStatus.ACCEPTED, job.to_json())
+
+    def do_DELETE(self) -> None:
+        job_id = self._job_id()
+        job = self.service.cancel(job_id) if job_id else None
+        if job is None:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "No such job"})
+        elif job.status in ("done", "failed"):
+            self._send_json(HTTPStatus.CONFLICT, job.to_json())
+        else:
+            # A running job reports "cancelled" once its worker has stopped.
+            self._send_json(HTTPStatus.ACCEPTED, job.to_json())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve waveform video renders from warm worker processes.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="Address to listen on; jobs name server-side files, so keep it local",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of warm worker processes, each rendering one job at a time",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="Jobs waiting beyond this many are refused with 503",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Envelope cache shared by all workers (see generate_waveform_video.py)",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=256,
+        help="Size cap of --cache-dir; least recently used entries are evicted",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    service = RenderService(
+        workers=max(1, args.workers),
+        queue_size=max(1, args.queue_size),
+        cache_dir=args.cache_dir,
+        cache_bytes=args.cache_size_mb * 1024 * 1024,
+    )
+    RequestHandler.service = service
+    # Stop gracefully on SIGTERM too, as sent by service managers.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    server = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+    print(
+        f"Serving waveform renders on http://{args.host}:{args.port} "
+        f"with {len(service.slots)} workers"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down.")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()